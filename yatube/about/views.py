@@ -1,9 +1,19 @@
-from django.views.generic.base import TemplateView
+from django.views.generic.base import View
 
+from core.prerender import serve
 
-class AboutAuthorView(TemplateView):
-    template_name = 'about/author.html'
 
+class PrerenderedView(View):
+    """Страница, собранная командой prerender."""
+    page = None
 
-class AboutTechView(TemplateView):
-    template_name = 'about/tech.html'
+    def get(self, request, *args, **kwargs):
+        return serve(request, self.page)
+
+
+class AboutAuthorView(PrerenderedView):
+    page = 'about_author'
+
+
+class AboutTechView(PrerenderedView):
+    page = 'about_tech'
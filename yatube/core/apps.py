@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .auth import check_user_cache, forget_user
+        from .db import configure_sqlite
+        from .pagecache import check_page_cache
+
+        check_user_cache()
+        check_page_cache()
+        connection_created.connect(configure_sqlite)
+        user = get_user_model()
+        post_save.connect(forget_user, sender=user)
+        post_delete.connect(forget_user, sender=user)
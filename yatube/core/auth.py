@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+# Кеши, которые живут внутри одного процесса
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def user_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+# Движки сессий, которые хранят сессии в кеше
+CACHED_SESSIONS = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def check_user_cache():
+    """Кеш пользователей и сессии в кеше включаются только с общим для
+    всех процессов кешем: иначе смена пароля, блокировка или выход
+    сбрасывают запись лишь в одном воркере, а остальные до истечения
+    записи пускают пользователя по старой сессии."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHES:
+        return
+    if settings.USER_CACHE_TIMEOUT:
+        raise ImproperlyConfigured(
+            f'USER_CACHE_TIMEOUT требует общего кеша, а не {backend}'
+        )
+    if settings.SESSION_ENGINE in CACHED_SESSIONS:
+        raise ImproperlyConfigured(
+            f'{settings.SESSION_ENGINE} требует общего кеша, а не {backend}'
+        )
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который при USER_CACHE_TIMEOUT > 0 берет
+    пользователя сессии из кеша. Запись сбрасывается при сохранении
+    и удалении пользователя, в том числе при смене пароля. Изменения
+    через QuerySet.update() сигналов не шлют: после них нужно сбросить
+    user_key вручную."""
+
+    def get_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        if not timeout:
+            return super().get_user(user_id)
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout)
+        return user
+
+
+def forget_user(sender, instance, **kwargs):
+    cache.delete(user_key(instance.pk))
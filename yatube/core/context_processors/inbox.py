@@ -0,0 +1,12 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.inbox import unread_count
+
+
+def inbox(request):
+    """Добавляет число непрочитанных постов. Запрос к базе выполняется,
+    только если шаблон выводит это число."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'inbox_unread': SimpleLazyObject(lambda: unread_count(user))}
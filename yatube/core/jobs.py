@@ -0,0 +1,164 @@
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger('yatube.jobs')
+
+
+def enqueue(function, *, priority=0, delay=0, max_attempts=None, **kwargs):
+    """Ставит вызов function(**kwargs) в очередь. Аргументы должны
+    сериализоваться в JSON, функция доступна по полному имени."""
+    return Job.objects.create(
+        name=f'{function.__module__}.{function.__qualname__}',
+        payload=json.dumps(kwargs),
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    """Пауза перед повтором растет вдвое с каждой попыткой."""
+    return min(
+        settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_SECONDS
+    )
+
+
+def claimable(now):
+    """Задачи в очереди и задачи упавших воркеров с истекшей арендой."""
+    return Job.objects.filter(
+        Q(status=Job.QUEUED) | Q(status=Job.RUNNING, locked_until__lt=now),
+        run_at__lte=now,
+        attempts__lt=F('max_attempts'),
+    )
+
+
+def fail_abandoned(now):
+    """Задачи, чей воркер упал на последней попытке, больше не будут
+    взяты и помечаются ошибкой, когда истекает аренда."""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED,
+        finished=now,
+        locked_until=None,
+        last_error='Аренда истекла на последней попытке',
+    )
+
+
+def claim(worker, limit=1, lease=None):
+    """Берет в аренду до limit задач по приоритету. В SQLite нет
+    SELECT FOR UPDATE, поэтому задача захватывается условным UPDATE:
+    число попыток служит версией строки, и из двух воркеров задачу
+    получает только тот, чей UPDATE изменил строку."""
+    now = timezone.now()
+    lease = lease or settings.JOB_LEASE_SECONDS
+    fail_abandoned(now)
+    candidates = claimable(now).order_by(
+        '-priority', 'run_at', 'pk'
+    ).values_list('pk', 'attempts')[:limit]
+    claimed = []
+    for pk, attempts in candidates:
+        updated = claimable(now).filter(pk=pk, attempts=attempts).update(
+            status=Job.RUNNING,
+            attempts=attempts + 1,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=lease),
+            started=now,
+        )
+        if updated:
+            claimed.append(pk)
+    return list(
+        Job.objects.filter(pk__in=claimed).order_by('-priority', 'run_at')
+    )
+
+
+def run_job(job, worker):
+    """Выполняет задачу и записывает результат, если аренда еще наша."""
+    start = time.monotonic()
+    error = ''
+    try:
+        function = import_string(job.name)
+        function(**json.loads(job.payload))
+    except Exception:
+        error = traceback.format_exc()
+    now = timezone.now()
+    duration = (time.monotonic() - start) * 1000
+    wait = max((job.started - job.run_at).total_seconds() * 1000, 0)
+    values = {
+        'finished': now,
+        'duration_ms': duration,
+        'wait_ms': wait,
+        'last_error': error,
+        'locked_until': None,
+    }
+    if not error:
+        values['status'] = Job.DONE
+    elif job.attempts >= job.max_attempts:
+        values['status'] = Job.FAILED
+    else:
+        values['status'] = Job.QUEUED
+        values['run_at'] = now + timedelta(seconds=backoff(job.attempts))
+    Job.objects.filter(
+        pk=job.pk, locked_by=worker, attempts=job.attempts
+    ).update(**values)
+    record = {
+        'job': job.pk,
+        'name': job.name,
+        'status': values['status'],
+        'attempt': job.attempts,
+        'wait_ms': round(wait, 2),
+        'duration_ms': round(duration, 2),
+    }
+    if error:
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+    return values['status']
+
+
+class Worker:
+    """Забирает задачи пачками по числу потоков и выполняет их в пуле."""
+
+    def __init__(self, name, threads=1, lease=None):
+        self.name = name
+        self.threads = threads
+        self.lease = lease
+        self.pool = (
+            ThreadPoolExecutor(threads, thread_name_prefix='job')
+            if threads > 1 else None
+        )
+
+    def run_once(self):
+        """Выполняет одну пачку, возвращает число задач в ней."""
+        jobs = claim(self.name, self.threads, self.lease)
+        if self.pool is None:
+            for job in jobs:
+                run_job(job, self.name)
+        else:
+            list(self.pool.map(self.run_in_thread, jobs))
+        return len(jobs)
+
+    def run_in_thread(self, job):
+        try:
+            return run_job(job, self.name)
+        finally:
+            close_old_connections()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
@@ -0,0 +1,210 @@
+import io
+import logging
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import reverse
+
+logger = logging.getLogger('yatube.loadtest')
+
+# Сценарий по умолчанию: веса примерно повторяют долю запросов на проде.
+# Значение-список выбирается случайно, строка с "$" берется из выборки
+# реальных объектов базы.
+DEFAULT_SCENARIO = [
+    {'name': 'posts:home', 'weight': 30, 'query': {'page': [1, 2, 3]}},
+    {'name': 'posts:group_posts', 'weight': 15,
+     'kwargs': {'slug': '$group'}},
+    {'name': 'posts:profile', 'weight': 15,
+     'kwargs': {'username': '$author'}},
+    {'name': 'posts:post_detail', 'weight': 25,
+     'kwargs': {'post_id': '$post'}},
+    {'name': 'posts:follow_index', 'weight': 10, 'auth': True},
+    {'name': 'posts:add_comment', 'weight': 5, 'auth': True,
+     'method': 'POST', 'kwargs': {'post_id': '$post'},
+     'data': {'text': 'Комментарий из нагрузочного теста'}},
+]
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга, values отсортированы."""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def session_cookie(user):
+    """Cookie авторизованной сессии, как после входа на сайт."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def csrf_pair():
+    """Cookie и значение поля формы, которые примет CsrfViewMiddleware."""
+    request = HttpRequest()
+    token = get_token(request)
+    return request.META['CSRF_COOKIE'], token
+
+
+class WSGIDriver:
+    """Вызывает WSGI-приложение напрямую, без сети."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def request(self, method, path, query=None, data=None, cookie=''):
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': urlencode(query or {}),
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver',
+            'HTTP_COOKIE': cookie,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+
+        def start_response(value, headers, exc_info=None):
+            status.append(int(value.split()[0]))
+
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return status[0]
+
+
+class LoadTest:
+    def __init__(self, application, scenario, samples, users, seed=0):
+        self.driver = WSGIDriver(application)
+        self.scenario = scenario
+        self.samples = samples
+        self.rng = random.Random(seed)
+        self.cookies = []
+        for user in users:
+            csrf_cookie, token = csrf_pair()
+            self.cookies.append((
+                f'{session_cookie(user)}; '
+                f'{settings.CSRF_COOKIE_NAME}={csrf_cookie}',
+                token
+            ))
+
+    def resolve(self, value):
+        if isinstance(value, list):
+            return self.rng.choice(value)
+        if isinstance(value, str) and value.startswith('$'):
+            return self.rng.choice(self.samples[value[1:]])
+        return value
+
+    def plan(self, count):
+        """Заранее раскладывает сценарий на конкретные запросы."""
+        weights = [entry.get('weight', 1) for entry in self.scenario]
+        requests = []
+        for entry in self.rng.choices(self.scenario, weights, k=count):
+            kwargs = {
+                key: self.resolve(value)
+                for key, value in entry.get('kwargs', {}).items()
+            }
+            request = {
+                'name': entry['name'],
+                'method': entry.get('method', 'GET'),
+                'path': reverse(entry['name'], kwargs=kwargs),
+                'query': {
+                    key: self.resolve(value)
+                    for key, value in entry.get('query', {}).items()
+                },
+                'data': dict(entry.get('data', {})),
+                'cookie': '',
+            }
+            if entry.get('auth') and self.cookies:
+                cookie, token = self.rng.choice(self.cookies)
+                request['cookie'] = cookie
+                if request['method'] == 'POST':
+                    request['data']['csrfmiddlewaretoken'] = token
+            requests.append(request)
+        return requests
+
+    def execute(self, request):
+        start = time.perf_counter()
+        try:
+            status = self.driver.request(
+                request['method'], request['path'], request['query'],
+                request['data'], request['cookie']
+            )
+        except Exception:
+            # Ошибки представлений Django сам превращает в ответ 500,
+            # сюда доходят сбои драйвера и middleware
+            logger.exception('%s %s', request['method'], request['path'])
+            status = 500
+        return request['name'], status, time.perf_counter() - start
+
+    def run(self, count, concurrency):
+        requests = self.plan(count)
+        start = time.perf_counter()
+        if concurrency == 1:
+            # Последовательный прогон служит базовой линией для сравнения
+            results = [self.execute(request) for request in requests]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(self.execute, requests))
+        elapsed = time.perf_counter() - start
+        return self.report(results, elapsed, concurrency)
+
+    def report(self, results, elapsed, concurrency):
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        for name, status, duration in results:
+            timings[name].append(duration * 1000)
+            if status >= 400:
+                errors[name] += 1
+        views = {}
+        for name, values in sorted(timings.items()):
+            values.sort()
+            views[name] = {
+                'count': len(values),
+                'errors': errors[name],
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'mean_ms': round(sum(values) / len(values), 2),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p90_ms': round(percentile(values, 90), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'max_ms': round(values[-1], 2),
+            }
+        return {
+            'requests': len(results),
+            'concurrency': concurrency,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(results) / elapsed, 2),
+            'errors': sum(errors.values()),
+            'views': views,
+        }
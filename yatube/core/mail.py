@@ -0,0 +1,150 @@
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Job, OutboxMessage
+
+FLUSH_JOB = 'core.mail.flush_outbox'
+# Заголовок с областью склейки повторов, в письмо не попадает
+DEDUPE_HEADER = 'X-Outbox-Dedupe'
+
+
+def dedupe_key(message):
+    """Ключ склейки повторов или '' для писем без DEDUPE_HEADER."""
+    scope = message.extra_headers.get(DEDUPE_HEADER)
+    if not scope:
+        return ''
+    recipients = ','.join(sorted(message.recipients()))
+    return hashlib.sha256(f'{recipients}\n{scope}'.encode()).hexdigest()
+
+
+def serialize(message):
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': {
+            name: value for name, value in message.extra_headers.items()
+            if name != DEDUPE_HEADER
+        },
+        'alternatives': getattr(message, 'alternatives', []),
+    })
+
+
+def deserialize(data):
+    values = json.loads(data)
+    alternatives = values.pop('alternatives')
+    message = EmailMultiAlternatives(**values)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который только сохраняет письма в таблицу.
+    Отправку выполняет фоновая задача flush_outbox. Письма с заголовком
+    DEDUPE_HEADER склеиваются: повтор с той же областью тем же
+    получателям в течение OUTBOX_DEDUPE_SECONDS не создает новое,
+    неотправленное письмо заменяется свежим, уже отправленное
+    не дублируется. Письма с вложениями уходят сразу через
+    OUTBOX_DELIVERY_BACKEND."""
+
+    def send_messages(self, email_messages):
+        since = timezone.now() - timedelta(
+            seconds=settings.OUTBOX_DEDUPE_SECONDS
+        )
+        direct = []
+        queued = 0
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            if message.attachments:
+                direct.append(message)
+                continue
+            key = dedupe_key(message)
+            previous = key and OutboxMessage.objects.filter(
+                dedupe_key=key, created__gte=since
+            ).order_by('-created').first()
+            if not previous:
+                OutboxMessage.objects.create(
+                    dedupe_key=key,
+                    recipients=', '.join(message.recipients()),
+                    subject=message.subject[:255],
+                    data=serialize(message),
+                )
+                queued += 1
+            elif previous.sent is None:
+                OutboxMessage.objects.filter(
+                    pk=previous.pk, sent__isnull=True
+                ).update(data=serialize(message))
+        if queued:
+            schedule_flush()
+        if direct:
+            connection = get_connection(
+                settings.OUTBOX_DELIVERY_BACKEND,
+                fail_silently=self.fail_silently
+            )
+            connection.send_messages(direct)
+        return len(email_messages)
+
+
+def schedule_flush():
+    """Одна задача отправки на все письма, накопленные за
+    OUTBOX_FLUSH_DELAY секунд."""
+    if not Job.objects.filter(name=FLUSH_JOB, status=Job.QUEUED).exists():
+        enqueue(flush_outbox, priority=10, delay=settings.OUTBOX_FLUSH_DELAY)
+
+
+def unclaimed(now):
+    """Неотправленные письма без пачки и из пачек, которые за
+    OUTBOX_CLAIM_SECONDS так и не отправились: их воркер упал."""
+    stale = now - timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+    return OutboxMessage.objects.filter(
+        Q(claimed__isnull=True) | Q(claimed__lt=stale), sent__isnull=True
+    )
+
+
+def flush_outbox(batch_size=None):
+    """Отправляет очередь пачками через одно соединение с почтовым
+    сервером. Пачка сначала помечается своим токеном и временем, чтобы
+    параллельный запуск не отправил те же письма. Возвращает число
+    отправленных."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    total = 0
+    connection = get_connection(settings.OUTBOX_DELIVERY_BACKEND)
+    with connection:
+        while True:
+            token = uuid.uuid4().hex
+            now = timezone.now()
+            pending = unclaimed(now).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size]
+            ids = list(pending)
+            if not ids:
+                return total
+            unclaimed(now).filter(pk__in=ids).update(
+                batch=token, claimed=now
+            )
+            batch = OutboxMessage.objects.filter(batch=token)
+            messages = [deserialize(data) for data in
+                        batch.values_list('data', flat=True)]
+            try:
+                connection.send_messages(messages)
+            except Exception:
+                # Письма вернутся в очередь, задача будет повторена
+                batch.update(batch='', claimed=None)
+                raise
+            batch.update(sent=timezone.now())
+            total += len(messages)
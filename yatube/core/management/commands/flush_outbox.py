@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import flush_outbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет накопленные в core.OutboxMessage письма.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        sent = flush_outbox(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Отправлено писем: {sent}'))
@@ -0,0 +1,71 @@
+import json
+import random
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import DEFAULT_SCENARIO, LoadTest
+from posts.models import Group, Post, User
+
+SAMPLE_SIZE = 200
+
+
+def sample(queryset):
+    """Случайные значения из всех баз постов."""
+    values = set()
+    for alias in settings.POST_SHARDS:
+        values.update(queryset.using(alias).order_by('?')[:SAMPLE_SIZE])
+    return random.sample(sorted(values), min(len(values), SAMPLE_SIZE))
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон WSGI-приложения: задержки p50/p99 '
+            'и пропускная способность по именам URL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            help='JSON-файл со списком URL и весов, по умолчанию '
+                 'встроенный сценарий.'
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько авторизованных пользователей использовать.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Куда сохранить отчет JSON.')
+
+    def handle(self, *args, **options):
+        scenario = DEFAULT_SCENARIO
+        if options['scenario']:
+            with open(options['scenario'], encoding='utf-8') as source:
+                scenario = json.load(source)
+        samples = {
+            'group': list(Group.objects.order_by('?').values_list(
+                'slug', flat=True)[:SAMPLE_SIZE]),
+            'author': sample(User.objects.filter(
+                posts__isnull=False
+            ).distinct().values_list('username', flat=True)),
+            'post': sample(Post.objects.values_list('pk', flat=True)),
+        }
+        for entry in scenario:
+            for value in entry.get('kwargs', {}).values():
+                if str(value).startswith('$') and not samples[value[1:]]:
+                    raise CommandError(
+                        f'Для {entry["name"]} нет данных, '
+                        f'заполните базу командой seed'
+                    )
+        users = User.objects.filter(
+            follower__isnull=False
+        ).distinct()[:options['users']]
+        report = LoadTest(
+            WSGIHandler(), scenario, samples, users, options['seed']
+        ).run(options['requests'], options['concurrency'])
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as result:
+                result.write(output)
+        self.stdout.write(output)
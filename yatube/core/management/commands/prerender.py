@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.prerender import build
+
+
+class Command(BaseCommand):
+    help = ('Собирает страницы about и страницы ошибок в PRERENDER_ROOT. '
+            'Запускается при выкладке, после нее процессы перезапускаются.')
+
+    def handle(self, *args, **options):
+        manifest = build(settings.PRERENDER_ROOT)
+        for name, filename in manifest.items():
+            self.stdout.write(f'{name}: {filename}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Собрано страниц: {len(manifest)}'
+        ))
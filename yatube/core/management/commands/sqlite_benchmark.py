@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_sqlite_pragmas
+
+
+def run_workload(path, pragmas, writers, readers, seconds):
+    """Писатели и читатели в отдельных потоках, каждый со своим
+    соединением. Возвращает число операций и ошибок блокировки."""
+    setup = sqlite3.connect(path)
+    apply_sqlite_pragmas(setup, pragmas)
+    setup.execute(
+        'CREATE TABLE IF NOT EXISTS post '
+        '(id INTEGER PRIMARY KEY, author INTEGER, text TEXT)'
+    )
+    setup.execute('CREATE INDEX IF NOT EXISTS post_author ON post (author)')
+    setup.commit()
+    setup.close()
+    counters = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(is_writer, number):
+        connection = sqlite3.connect(path, timeout=0, check_same_thread=False)
+        apply_sqlite_pragmas(connection, pragmas)
+        done = locked = 0
+        while time.perf_counter() < deadline:
+            try:
+                if is_writer:
+                    connection.execute(
+                        'INSERT INTO post (author, text) VALUES (?, ?)',
+                        (number, 'x' * 200)
+                    )
+                    connection.commit()
+                else:
+                    connection.execute(
+                        'SELECT id, text FROM post WHERE author = ? '
+                        'ORDER BY id DESC LIMIT 10', (number,)
+                    ).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                locked += 1
+                connection.rollback()
+        connection.close()
+        with lock:
+            counters['writes' if is_writer else 'reads'] += done
+            counters['locked'] += locked
+
+    threads = [
+        threading.Thread(target=worker, args=(True, i))
+        for i in range(writers)
+    ] + [
+        threading.Thread(target=worker, args=(False, i))
+        for i in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counters
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает конкурентные чтение и запись в SQLite '
+            'с настройками по умолчанию и с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        # busy_timeout задан в обоих режимах, иначе базовый режим
+        # состоит почти из одних ошибок блокировки
+        modes = {
+            'default': {'busy_timeout': 5000},
+            'tuned': settings.SQLITE_PRAGMAS,
+        }
+        for mode, pragmas in modes.items():
+            with tempfile.TemporaryDirectory() as directory:
+                result = run_workload(
+                    os.path.join(directory, 'bench.sqlite3'), pragmas,
+                    options['writers'], options['readers'],
+                    options['seconds']
+                )
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{mode}: запись {result["writes"] / seconds:.0f} оп/с, '
+                f'чтение {result["reads"] / seconds:.0f} оп/с, '
+                f'ошибок блокировки {result["locked"]}'
+            )
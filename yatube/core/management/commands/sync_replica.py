@@ -0,0 +1,23 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файл реплики. Нужна для '
+            'проверки маршрутизации чтения на локальной машине.')
+
+    def handle(self, *args, **options):
+        replica = settings.DATABASE_REPLICA
+        if not replica:
+            raise CommandError(
+                'Реплика не настроена: задайте YATUBE_REPLICA_DB'
+            )
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        target = sqlite3.connect(settings.DATABASES[replica]['NAME'])
+        with source, target:
+            source.backup(target)
+        source.close()
+        target.close()
+        self.stdout.write(self.style.SUCCESS('Реплика обновлена'))
@@ -0,0 +1,51 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из таблицы core.Job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOB_WORKER_THREADS
+        )
+        parser.add_argument(
+            '--lease', type=int, default=settings.JOB_LEASE_SECONDS,
+            help='На сколько секунд задача закрепляется за воркером.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать готовые задачи и завершиться.'
+        )
+        parser.add_argument('--name')
+
+    def handle(self, *args, **options):
+        name = options['name'] or f'{socket.gethostname()}:{os.getpid()}'
+        worker = Worker(name, options['threads'], options['lease'])
+        total = 0
+        try:
+            while True:
+                done = worker.run_once()
+                total += done
+                if done:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: выполнено задач {total}'
+        ))
@@ -0,0 +1,210 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.messages.storage import default_storage
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject, empty
+
+from .routers import pinned_user_id, set_pinned
+
+logger = logging.getLogger('yatube.performance')
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Счетчики одного запроса: SQL, время базы и шаблонов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.render_depth = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Повторы одного и того же SQL с разными параметрами: признак N+1."""
+        return {
+            sql: count for sql, count in self.statements.items() if count > 1
+        }
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        stats = getattr(_local, 'stats', None)
+        # Вложенные include учитываются во внешнем шаблоне
+        if stats is None or stats.render_depth:
+            return render(self, context)
+        stats.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_time += time.perf_counter() - start
+            stats.render_depth -= 1
+
+    wrapper.timed = True
+    return wrapper
+
+
+class QueryTimingMiddleware:
+    """Считает запросы к базе и время рендеринга каждого запроса,
+    отдает их в Server-Timing и в лог yatube.performance. При нулевой
+    доле выборки не подключается, и шаблоны не оборачиваются."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_TIMING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if not getattr(Template.render, 'timed', False):
+            Template.render = _timed_render(Template.render)
+
+    def __call__(self, request):
+        if random.random() >= settings.QUERY_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        stats = RequestStats()
+        _local.stats = stats
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(stats)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        total = (time.perf_counter() - start) * 1000
+        duplicates = stats.duplicates
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.db_time * 1000:.1f};'
+            f'desc="{stats.queries} queries"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+            f'dup;desc="{sum(duplicates.values())} duplicate queries"',
+            f'total;dur={total:.1f}',
+        ))
+        self.log(request, response, stats, total, duplicates)
+        return response
+
+    def log(self, request, response, stats, total, duplicates):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total, 1),
+            'db_ms': round(stats.db_time * 1000, 1),
+            'template_ms': round(stats.template_time * 1000, 1),
+            'queries': stats.queries,
+            'duplicate_queries': sum(duplicates.values()),
+        }
+        if total >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            record['duplicates'] = [
+                {'sql': sql, 'count': count}
+                for sql, count in Counter(duplicates).most_common(5)
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет чтения за основной базой, если пользователь недавно
+    что-то записал, см. core.routers.pin_primary. Должен стоять после
+    AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user_id = settings.DATABASE_REPLICA and pinned_user_id(request)
+        set_pinned(bool(
+            user_id
+            and request.user.is_authenticated
+            and user_id == str(request.user.pk)
+        ))
+        try:
+            return self.get_response(request)
+        finally:
+            set_pinned(False)
+
+
+def anonymous_read(request):
+    """GET или HEAD без cookie сессии: пользователь заведомо аноним."""
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def untouched(lazy):
+    return isinstance(lazy, SimpleLazyObject) and lazy._wrapped is empty
+
+
+class LazySessionMiddleware(SessionMiddleware):
+    """Для анонимного чтения хранилище сессии создается только при
+    первом обращении к request.session."""
+
+    def process_request(self, request):
+        if not anonymous_read(request):
+            return super().process_request(request)
+        request.session = SimpleLazyObject(lambda: self.SessionStore(None))
+
+    def process_response(self, request, response):
+        if untouched(getattr(request, 'session', None)):
+            # Ответ другому пользователю отличается, кешам нужен Vary
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return super().process_response(request, response)
+
+
+class LazyAuthenticationMiddleware(AuthenticationMiddleware):
+    """Анонимному чтению сразу назначается AnonymousUser, сессия
+    для поиска пользователя не открывается."""
+
+    def process_request(self, request):
+        if anonymous_read(request):
+            request.user = AnonymousUser()
+            return None
+        return super().process_request(request)
+
+
+class LazyMessageMiddleware(MessageMiddleware):
+    """Хранилище сообщений для анонимного чтения создается, только если
+    представление или шаблон к нему обратились."""
+
+    def process_request(self, request):
+        if not anonymous_read(request):
+            return super().process_request(request)
+        request._messages = SimpleLazyObject(
+            lambda: default_storage(request)
+        )
+
+    def process_response(self, request, response):
+        if untouched(getattr(request, '_messages', None)):
+            return response
+        return super().process_response(request, response)
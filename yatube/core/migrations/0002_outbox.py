@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dedupe_key', models.CharField(max_length=64)),
+                ('recipients', models.TextField(verbose_name='получатели')),
+                ('subject', models.CharField(max_length=255, verbose_name='тема')),
+                ('data', models.TextField(verbose_name='письмо в JSON')),
+                ('batch', models.CharField(blank=True, max_length=32)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('sent', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'письмо',
+                'verbose_name_plural': 'исходящие письма',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['dedupe_key', '-created'], name='outbox_dedupe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['sent', 'batch'], name='outbox_pending_idx'),
+        ),
+    ]
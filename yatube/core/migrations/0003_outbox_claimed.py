@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача для команды worker."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнена'),
+        (FAILED, 'ошибка'),
+    )
+
+    name = models.CharField('функция', max_length=200)
+    payload = models.TextField('аргументы в JSON', default='{}')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    wait_ms = models.FloatField('ожидание в очереди, мс', null=True)
+    duration_ms = models.FloatField('время выполнения, мс', null=True)
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'задачи'
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_claim_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ожидающее отправки, см. core.mail."""
+    dedupe_key = models.CharField(max_length=64)
+    recipients = models.TextField('получатели')
+    subject = models.CharField('тема', max_length=255)
+    data = models.TextField('письмо в JSON')
+    batch = models.CharField(max_length=32, blank=True)
+    claimed = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'письмо'
+        verbose_name_plural = 'исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['dedupe_key', '-created'], name='outbox_dedupe_idx'
+            ),
+            models.Index(fields=['sent', 'batch'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
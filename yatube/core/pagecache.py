@@ -0,0 +1,166 @@
+"""Кеш страниц с дырками. Общий для всех скелет страницы хранится
+один раз, а персональные части помечены тегом {% hole %}
+и дорисовываются на каждый запрос из дешевых данных пользователя.
+
+Скелет зависит от семейств: ленты, группы, автора, отдельного поста.
+У каждого семейства свое поколение в кеше, запись скелета помнит
+поколения, с которыми ее нарисовали, и устаревает, как только
+сменилось хотя бы одно. Поколения должны видеть все процессы,
+поэтому кеш страниц работает только с общим кешем."""
+import hashlib
+import json
+import re
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from .auth import LOCAL_CACHES
+
+# Семейство, от которого зависит любая страница
+ALL = 'all'
+HOLE = re.compile(r'<!--hole (.*?)-->')
+
+
+def check_page_cache():
+    """Поколения в кеше одного процесса сбрасываются только в нем,
+    остальные воркеры продолжали бы отдавать старые скелеты."""
+    if not settings.PAGE_CACHE_TIMEOUT:
+        return
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f'PAGE_CACHE_TIMEOUT требует общего кеша, а не {backend}'
+        )
+
+
+def generation_key(family):
+    return f'pagecache:generation:{family}'
+
+
+def generations(families):
+    """{семейство: поколение}, у несброшенных семейств поколение None."""
+    found = cache.get_many([generation_key(family) for family in families])
+    return {
+        family: found.get(generation_key(family)) for family in families
+    }
+
+
+def bump(*families):
+    """Устаревают скелеты, зависящие от любого из семейств."""
+    cache.set_many({
+        generation_key(family): uuid.uuid4().hex for family in families
+    }, None)
+
+
+def bump_generation(update_fields=None, **kwargs):
+    """Сбрасывает все скелеты. Подключается к сигналам моделей,
+    которые выводятся на любой странице. Вход пользователя обновляет
+    только last_login и кеш не трогает."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump(ALL)
+
+
+def depends_on(request, *families):
+    """Отмечает семейства, от которых зависит рисуемая страница.
+    Поколения читаются в момент вызова, поэтому известные заранее
+    семейства отмечаются до чтения данных: запись, попавшая между
+    ними, сменит поколение и не оставит в кеше старый скелет. Без
+    кеша страниц ничего не делает."""
+    seen = getattr(request, 'page_generations', None)
+    if seen is not None:
+        seen.update(generations(
+            [family for family in families if family not in seen]
+        ))
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{path}'
+
+
+def placeholder(template_name, args):
+    """Метка дырки в скелете. '>' в JSON встречается только внутри
+    строк, поэтому его замена на \\u003e не дает метке оборваться."""
+    payload = json.dumps([template_name, args]).replace('>', '\\u003e')
+    return f'<!--hole {payload}-->'
+
+
+def fill(request, skeleton):
+    """Дорисовывает дырки скелета для пользователя запроса. Шаблон
+    дырки видит только свои аргументы и контекст запроса: user,
+    csrf_token, request и данные контекстных процессоров."""
+    def render_hole(match):
+        template_name, args = json.loads(match.group(1))
+        return render_to_string(template_name, args, request)
+
+    return HOLE.sub(render_hole, skeleton)
+
+
+def fill_response(request, response):
+    """Дорисовывает дырки, оставленные в ответе фрагментами {% cache %},
+    общими для всех пользователей."""
+    if response.status_code == 200 and not response.streaming:
+        response.content = fill(
+            request, response.content.decode(response.charset)
+        )
+    return response
+
+
+def is_fresh(entry):
+    return (entry is not None
+            and generations(list(entry['generations']))
+            == entry['generations'])
+
+
+def replay(request, entry):
+    """Ответ из записи кеша: тот же статус и заголовки, дырки
+    дорисованы для пользователя запроса."""
+    response = HttpResponse(
+        fill(request, entry['content']), status=entry['status']
+    )
+    for header, value in entry['headers']:
+        response[header] = value
+    return response
+
+
+def hole_punched(view):
+    """Кеширует скелет GET-ответа со статусом и заголовками на
+    PAGE_CACHE_TIMEOUT секунд или до смены поколения одного из его
+    семейств, см. depends_on. Пока скелет свеж, представление не
+    вызывается, запросы к базе делают только дырки. При
+    PAGE_CACHE_TIMEOUT = 0 кеш выключен, а теги hole рисуют свои
+    шаблоны на месте."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        if not timeout or request.method not in ('GET', 'HEAD'):
+            return fill_response(request, view(request, *args, **kwargs))
+        key = page_key(request)
+        entry = cache.get(key)
+        if is_fresh(entry):
+            return replay(request, entry)
+        request.page_generations = generations([ALL])
+        request.punch_holes = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            request.punch_holes = False
+        if response.status_code != 200 or response.streaming:
+            return response
+        entry = {
+            'generations': request.page_generations,
+            'status': response.status_code,
+            # Cookie ответа персональные и в общий скелет не попадают
+            'headers': list(response.items()),
+            'content': response.content.decode(response.charset),
+        }
+        cache.set(key, entry, timeout)
+        return replay(request, entry)
+
+    return wrapper
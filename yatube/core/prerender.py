@@ -0,0 +1,125 @@
+"""Страницы, которые собираются заранее командой prerender: about
+и страницы ошибок. Имя файла содержит хеш содержимого, manifest.json
+связывает имя страницы с текущим файлом. Процесс читает манифест
+и файлы один раз, поэтому после сборки его нужно перезапустить."""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest, HttpResponse
+from django.template.loader import render_to_string
+from django.urls import resolve, reverse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .pagecache import fill
+
+MANIFEST = 'manifest.json'
+# Место адреса на странице 404, подставляется при ответе
+PATH_SLOT = '<!--path-->'
+
+# Имя страницы: шаблон и имя URL. Страницы с адресом собираются
+# скелетом с дырками, страницы ошибок — целиком для анонима
+PAGES = {
+    'about_author': ('about/author.html', 'about:author'),
+    'about_tech': ('about/tech.html', 'about:tech'),
+    '403': ('core/403.html', None),
+    '403csrf': ('core/403csrf.html', None),
+    '404': ('core/404.html', None),
+    '500': ('core/500.html', None),
+}
+
+
+def build_request(url_name):
+    """Запрос анонима, от имени которого рисуется страница."""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse(url_name) if url_name else '/'
+    request.user = AnonymousUser()
+    if url_name:
+        request.resolver_match = resolve(request.path)
+        request.punch_holes = True
+    return request
+
+
+def render_page(name):
+    template_name, url_name = PAGES[name]
+    return render_to_string(
+        template_name, {'path': mark_safe(PATH_SLOT)},
+        build_request(url_name)
+    )
+
+
+def build(root):
+    """Собирает все страницы в root и атомарно заменяет манифест.
+    Файлы, на которые не ссылаются ни новый, ни прежний манифест,
+    удаляются: прежний еще читают незакрытые процессы."""
+    os.makedirs(root, exist_ok=True)
+    previous = read_manifest(root)
+    manifest = {}
+    for name in PAGES:
+        content = render_page(name).encode()
+        digest = hashlib.md5(content).hexdigest()[:12]
+        manifest[name] = f'{name}.{digest}.html'
+        with open(os.path.join(root, manifest[name]), 'wb') as file:
+            file.write(content)
+    temporary = os.path.join(root, f'{MANIFEST}.tmp')
+    with open(temporary, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary, os.path.join(root, MANIFEST))
+    keep = {MANIFEST, *manifest.values(), *previous.values()}
+    for filename in os.listdir(root):
+        if filename.endswith('.html') and filename not in keep:
+            os.remove(os.path.join(root, filename))
+    load_manifest.cache_clear()
+    return manifest
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+@lru_cache(maxsize=None)
+def load_manifest(root):
+    return read_manifest(root)
+
+
+@lru_cache(maxsize=None)
+def read_page(root, filename):
+    """Файлы неизменяемы: новая версия получает новое имя."""
+    with open(os.path.join(root, filename), encoding='utf-8') as file:
+        return file.read()
+
+
+def page_content(name):
+    root = settings.PRERENDER_ROOT
+    filename = load_manifest(root).get(name)
+    if filename is None:
+        # Сборки еще не было, рисуем так же, как команда
+        return render_page(name)
+    return read_page(root, filename)
+
+
+def serve(request, name, status=HTTPStatus.OK):
+    """Ответ готовой страницей с ETag. Базу трогают только дырки
+    страниц about, страницы ошибок к ней не обращаются."""
+    content = page_content(name)
+    if PAGES[name][1]:
+        content = fill(request, content)
+    content = content.replace(PATH_SLOT, escape(request.path))
+    response = HttpResponse(content, status=status)
+    set_response_etag(response)
+    if status != HTTPStatus.OK:
+        return response
+    return get_conditional_response(
+        request, etag=response['ETag'], response=response
+    )
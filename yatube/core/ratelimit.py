@@ -0,0 +1,128 @@
+"""Лимиты запросов по скользящему окну. Счетчики лежат в кеше default:
+с LocMemCache у каждого процесса свои, и N воркеров вместе пропускают
+N лимитов. В продакшене CACHES должен быть общим для всех процессов,
+например Memcached или Redis."""
+import math
+import time
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def client_key(request, key):
+    """Пользователь для key='user' (анонимы — по адресу) или адрес
+    для key='ip'."""
+    user = getattr(request, 'user', None)
+    if key == 'user' and user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def count(key, period):
+    """Атомарно засчитывает запрос в счетчике окна key."""
+    cache.add(key, 0, 2 * period)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснен из кеша между add и incr
+        cache.add(key, 1, 2 * period)
+        return 1
+
+
+def hit(name, ident, rate):
+    """Засчитывает запрос. Запросы считаются атомарным incr в окнах
+    по period секунд, а лимит проверяется по скользящему окну: к
+    текущему счетчику добавляется доля прошлого окна, которая еще
+    не вышла из последних period секунд. Поэтому на стыке окон клиент
+    не получает двойной лимит, а одновременные запросы получают
+    разные номера и вместе не проходят больше limit. Отклоненный
+    запрос не засчитывается. Возвращает секунды до момента, когда
+    запрос пройдет, если лимит исчерпан, иначе None."""
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window, elapsed = divmod(now, period)
+    key = f'ratelimit:{name}:{ident}'
+    current = count(f'{key}:{int(window)}', period)
+    previous = cache.get(f'{key}:{int(window) - 1}', 0)
+    share = elapsed / period
+    if previous * (1 - share) + current <= limit:
+        return None
+    cache.decr(f'{key}:{int(window)}')
+    if current > limit:
+        # Текущее окно заполнено само по себе
+        wait = period - elapsed
+    else:
+        # Ждем, пока доля прошлого окна уменьшится достаточно
+        wait = ((1 - (limit - current) / previous) - share) * period
+    return max(math.ceil(wait), 1)
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request, 'core/429.html', {'retry_after': retry_after},
+        status=HTTPStatus.TOO_MANY_REQUESTS
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def check(request, name, rule):
+    """None, если запрос укладывается в правило, иначе ответ 429."""
+    if not settings.RATELIMIT_ENABLED:
+        return None
+    if request.method not in rule.get('methods', ('POST',)):
+        return None
+    retry_after = hit(
+        name, client_key(request, rule.get('key', 'user')), rule['rate']
+    )
+    if retry_after is None:
+        return None
+    return too_many_requests(request, retry_after)
+
+
+def ratelimit(rate, key='user', methods=('POST',)):
+    """Декоратор представления с собственным лимитом."""
+    rule = {'rate': rate, 'key': key, 'methods': methods}
+
+    def decorator(view):
+        name = f'{view.__module__}.{view.__name__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = check(request, name, rule)
+            if response is not None:
+                return response
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Лимиты из RATELIMITS по имени URL. Должен стоять после
+    AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view, args, kwargs):
+        name = request.resolver_match.view_name
+        rule = settings.RATELIMITS.get(name)
+        if rule is None:
+            return None
+        return check(request, name, rule)
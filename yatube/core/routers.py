@@ -0,0 +1,79 @@
+import threading
+from functools import wraps
+
+from django.conf import settings
+
+_state = threading.local()
+PIN_SALT = 'core.routers.pin'
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def set_pinned(value):
+    _state.pinned = value
+
+
+def pin_response(request, response):
+    """Подписанная cookie: любой процесс, получивший следующий запрос,
+    REPLICA_PIN_SECONDS читает для этого пользователя из основной базы."""
+    response.set_signed_cookie(
+        settings.REPLICA_PIN_COOKIE, str(request.user.pk), salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS, httponly=True
+    )
+
+
+def pinned_user_id(request):
+    """id пользователя из непросроченной cookie закрепления или None."""
+    return request.get_signed_cookie(
+        settings.REPLICA_PIN_COOKIE, None, salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS
+    )
+
+
+def pin_primary(view):
+    """Запись пользователя: его чтения на REPLICA_PIN_SECONDS уходят
+    в основную базу, чтобы он сразу видел свои изменения. POST сам
+    читает из основной базы и закрепляет ее. GET закрепляет, только
+    ответив редиректом после записи: показ формы реплику не отключает."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICA:
+            return view(request, *args, **kwargs)
+        writing = request.method not in ('GET', 'HEAD')
+        if writing:
+            set_pinned(True)
+        response = view(request, *args, **kwargs)
+        if writing or response.status_code == 302:
+            pin_response(request, response)
+        return response
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Чтение моделей из REPLICA_ROUTED_APPS идет в реплику, запись
+    и все остальное, включая сессии и пользователей, в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        replica = settings.DATABASE_REPLICA
+        if (
+            replica
+            and model._meta.app_label in settings.REPLICA_ROUTED_APPS
+            and not is_pinned()
+        ):
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему вместе с данными из основной базы
+        if db == settings.DATABASE_REPLICA:
+            return False
+        return None
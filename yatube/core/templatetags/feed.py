@@ -0,0 +1,27 @@
+from django import template
+
+from posts.utils import make_cursor
+
+register = template.Library()
+
+
+@register.filter
+def feed_cursor(post):
+    """Курсор ленты сразу после post."""
+    return make_cursor(post)
+
+
+@register.filter
+def page_window(page, on_each_side=3):
+    """Номера страниц вокруг текущей, первая и последняя. Пропуски
+    обозначены None. Полный page_range на больших лентах дает тысячи
+    ссылок."""
+    last = page.paginator.num_pages
+    start = max(page.number - on_each_side, 1)
+    stop = min(page.number + on_each_side, last)
+    numbers = list(range(start, stop + 1))
+    if start > 1:
+        numbers = [1] + ([None] if start > 2 else []) + numbers
+    if stop < last:
+        numbers += ([None] if stop < last - 1 else []) + [last]
+    return numbers
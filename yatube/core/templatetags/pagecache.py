@@ -0,0 +1,21 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..pagecache import placeholder
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **args):
+    """{% hole 'includes/switcher.html' index=True %}: персональная
+    часть страницы. При сборке скелета для кеша выводит метку,
+    иначе рисует шаблон на месте. Внутри общих фрагментов {% cache %}
+    метку выводит и флаг punch_holes в контексте, дырки дорисовывает
+    fill_response. Аргументы должны сериализоваться в JSON."""
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False) or context.get('punch_holes'):
+        return mark_safe(placeholder(template_name, args))
+    hole_template = context.template.engine.get_template(template_name)
+    with context.push(**args):
+        return hole_template.render(context)
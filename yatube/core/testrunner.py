@@ -0,0 +1,37 @@
+"""Запуск тестов в режиме шардов. С YATUBE_SHARD_DBS посты живут
+в нескольких базах, поэтому каждый тест с базой открывает все базы
+POST_SHARDS, а базы шардов получают свои диапазоны id, как после
+команды init_shards."""
+from io import StringIO
+from unittest import TestSuite
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.test.runner import DiscoverRunner
+
+from posts.sharding import sharding_enabled
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+class ShardAwareRunner(DiscoverRunner):
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        if sharding_enabled():
+            for test in iter_tests(suite):
+                if isinstance(test, TransactionTestCase):
+                    type(test).databases = set(settings.POST_SHARDS)
+        return suite
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        if sharding_enabled():
+            call_command('init_shards', stdout=StringIO())
+        return old_config
@@ -0,0 +1,41 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from ..management.commands.sqlite_benchmark import run_workload
+
+
+class SQLitePragmasTest(TestCase):
+    def test_pragmas_applied(self):
+        """Новое соединение получает настройки из SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class SQLiteBenchmarkTest(SimpleTestCase):
+    def test_wal_workload(self):
+        """Нагрузка в режиме WAL выполняет и чтение, и запись."""
+        with tempfile.TemporaryDirectory() as directory:
+            result = run_workload(
+                os.path.join(directory, 'bench.sqlite3'),
+                {'journal_mode': 'wal', 'busy_timeout': 5000},
+                writers=2, readers=2, seconds=0.2
+            )
+        self.assertGreater(result['writes'], 0)
+        self.assertGreater(result['reads'], 0)
+
+    def test_benchmark_command(self):
+        """Команда печатает результаты для обоих режимов."""
+        out = StringIO()
+        call_command(
+            'sqlite_benchmark', writers=1, readers=1, seconds=0.1, stdout=out
+        )
+        self.assertIn('default:', out.getvalue())
+        self.assertIn('tuned:', out.getvalue())
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..jobs import claim, enqueue, run_job
+from ..models import Job
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def fail():
+    raise RuntimeError('Сбой задачи')
+
+
+@override_settings(JOB_RETRY_BASE_SECONDS=10, JOB_MAX_ATTEMPTS=2)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_worker_runs_by_priority(self):
+        """Воркер выполняет задачи по приоритету и сохраняет время."""
+        enqueue(record, value='обычная')
+        enqueue(record, value='срочная', priority=10)
+        enqueue(record, value='позже', delay=60)
+        call_command('worker', once=True, threads=1, stdout=StringIO())
+        self.assertEqual(CALLS, ['срочная', 'обычная'])
+        done = Job.objects.filter(status=Job.DONE)
+        self.assertEqual(done.count(), 2)
+        self.assertFalse(done.filter(duration_ms__isnull=True).exists())
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_claim_is_exclusive(self):
+        """Взятую задачу не получит другой воркер, пока не истекла
+        аренда."""
+        job = enqueue(record, value=1)
+        self.assertEqual(claim('first'), [job])
+        self.assertEqual(claim('second'), [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        reclaimed = claim('second')
+        self.assertEqual(reclaimed, [job])
+        self.assertEqual(reclaimed[0].attempts, 2)
+        # Первый воркер потерял аренду и не перезаписывает результат
+        run_job(Job.objects.get(pk=job.pk, locked_by='second'), 'first')
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача повторяется с паузой, затем помечается
+        ошибкой."""
+        job = enqueue(fail)
+        before = timezone.now()
+        [claimed] = claim('worker')
+        self.assertEqual(run_job(claimed, 'worker'), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('Сбой задачи', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        [claimed] = claim('worker')
+        self.assertEqual(run_job(claimed, 'worker'), Job.FAILED)
+        self.assertEqual(claim('worker'), [])
+
+    def test_abandoned_last_attempt_fails(self):
+        """Задача воркера, упавшего на последней попытке, после
+        истечения аренды помечается ошибкой."""
+        job = enqueue(record, value=1, max_attempts=1)
+        claim('crashed')
+        self.assertEqual(claim('other'), [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(claim('other'), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNone(job.locked_until)
@@ -0,0 +1,61 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Follow, Group, Post, User
+
+from ..loadtest import LoadTest, percentile
+
+
+def broken_application(environ, start_response):
+    raise RuntimeError('Сбой приложения')
+
+
+class LoadTestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertIsNone(percentile([], 50))
+
+    def test_failure_logged(self):
+        """Сбой запроса считается ошибкой 500, трассировка пишется в лог."""
+        load_test = LoadTest(broken_application, [], {}, [])
+        request = {'name': 'posts:home', 'method': 'GET', 'path': '/',
+                   'query': {}, 'data': {}, 'cookie': ''}
+        with self.assertLogs('yatube.loadtest', 'ERROR') as logs:
+            name, status, _ = load_test.execute(request)
+        self.assertEqual((name, status), ('posts:home', 500))
+        self.assertIn('RuntimeError: Сбой приложения', logs.output[0])
+
+    def test_loadtest_reports_every_view(self):
+        """Отчет содержит метрики по каждому имени URL из сценария."""
+        out = StringIO()
+        call_command(
+            'loadtest', requests=60, concurrency=1, users=1, stdout=out
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['requests'], 60)
+        self.assertEqual(report['errors'], 0)
+        for name in ('posts:home', 'posts:post_detail', 'posts:add_comment'):
+            with self.subTest(name=name):
+                self.assertIn('p99_ms', report['views'][name])
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..mail import DEDUPE_HEADER, FLUSH_JOB, flush_outbox
+from ..models import Job, OutboxMessage
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTest(TestCase):
+    def test_reset_requests_deduplicated(self):
+        """Повторные запросы сброса пароля дают одно письмо, а страница
+        отвечает без отправки почты."""
+        User.objects.create_user(
+            username='user', email='user@example.com', password='password'
+        )
+        for _ in range(3):
+            response = self.client.post(
+                reverse('users:password_reset_form'),
+                {'email': 'user@example.com'}
+            )
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertEqual(Job.objects.filter(name=FLUSH_JOB).count(), 1)
+        self.assertEqual(flush_outbox(), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertEqual(flush_outbox(), 0)
+
+    def test_plain_mail_not_deduplicated(self):
+        """Письма без заголовка склейки с одной темой не теряются,
+        сам заголовок в письмо не попадает."""
+        for _ in range(2):
+            mail.send_mail('Тема', 'Текст', 'from@example.com',
+                           ['a@example.com'])
+        self.assertEqual(flush_outbox(), 2)
+        mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['a@example.com'],
+            headers={DEDUPE_HEADER: 'scope'}
+        ).send()
+        flush_outbox()
+        self.assertNotIn(DEDUPE_HEADER, mail.outbox[-1].extra_headers)
+
+    def test_flush_in_batches(self):
+        """Очередь отправляется пачками, каждое письмо один раз."""
+        for number in range(5):
+            mail.send_mail(
+                'Тема', 'Текст', 'from@example.com', [f'{number}@example.com']
+            )
+        self.assertEqual(flush_outbox(batch_size=2), 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(
+            OutboxMessage.objects.filter(sent__isnull=True).exists()
+        )
+
+    def test_stale_batch_requeued(self):
+        """Пачку упавшего воркера берет следующий запуск, когда
+        истекает OUTBOX_CLAIM_SECONDS."""
+        mail.send_mail('Тема', 'Текст', 'from@example.com', ['a@example.com'])
+        OutboxMessage.objects.update(batch='dead', claimed=timezone.now())
+        self.assertEqual(flush_outbox(), 0)
+        OutboxMessage.objects.update(
+            claimed=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(flush_outbox(), 1)
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.functional import empty
+
+from posts.models import Group, Post, User
+
+from ..auth import check_user_cache
+
+
+@override_settings(QUERY_TIMING_SAMPLE_RATE=1.0)
+class QueryTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с числом запросов к базе."""
+        response = self.client.get(
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug})
+        )
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'queries"', 'tpl;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    @override_settings(QUERY_TIMING_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        """При нулевой доле выборки замеры не выполняются."""
+        response = self.client.get(reverse('posts:home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_logged(self):
+        """Медленный запрос пишется в лог с предупреждением."""
+        with self.assertLogs('yatube.performance', 'WARNING') as logs:
+            self.client.get(reverse('posts:home'))
+        self.assertIn('"view": "posts:home"', logs.output[0])
+
+
+class AnonymousFastPathTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_read_skips_session(self):
+        """Анонимный GET без cookie не открывает сессию, но ответ
+        помечен Vary: Cookie."""
+        response = self.client.get(reverse('about:author'))
+        request = response.wsgi_request
+        self.assertIs(request.session._wrapped, empty)
+        self.assertFalse(request.user.is_authenticated)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertNotIn('sessionid', response.cookies)
+
+    @override_settings(
+        USER_CACHE_TIMEOUT=300,
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db'
+    )
+    def test_session_and_user_cached(self):
+        """Повторный запрос пользователя не обращается к базе,
+        изменение пользователя сбрасывает кеш."""
+        self.client.force_login(self.user)
+        url = reverse('about:author')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.user.first_name = 'Новое'
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.wsgi_request.user.first_name, 'Новое')
+
+    def test_user_cache_needs_shared_cache(self):
+        """Кеш пользователей не включается с кешем одного процесса."""
+        with override_settings(USER_CACHE_TIMEOUT=300):
+            with self.assertRaises(ImproperlyConfigured):
+                check_user_cache()
+        engine = 'django.contrib.sessions.backends.cached_db'
+        with override_settings(SESSION_ENGINE=engine):
+            with self.assertRaises(ImproperlyConfigured):
+                check_user_cache()
+        with override_settings(USER_CACHE_TIMEOUT=0):
+            check_user_cache()
@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import User
+
+from ..prerender import load_manifest
+
+PRERENDER_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PRERENDER_ROOT=PRERENDER_ROOT)
+class PrerenderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PRERENDER_ROOT, ignore_errors=True)
+        load_manifest.cache_clear()
+
+    def setUp(self):
+        call_command('prerender', stdout=StringIO())
+
+    def test_versioned_files(self):
+        """Имена файлов содержат хеш, повторная сборка без изменений
+        шаблонов дает те же файлы."""
+        manifest = load_manifest(PRERENDER_ROOT)
+        self.assertRegex(manifest['404'], r'^404\.[0-9a-f]{12}\.html$')
+        call_command('prerender', stdout=StringIO())
+        self.assertEqual(load_manifest(PRERENDER_ROOT), manifest)
+
+    def test_about_etag(self):
+        """Шапка страницы about своя у каждого пользователя, повтор
+        с If-None-Match получает 304."""
+        url = reverse('about:author')
+        response = self.client.get(url)
+        self.assertContains(response, 'Войти')
+        self.assertTemplateNotUsed(response, 'about/author.html')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(url), 'Пользователь: reader')
+
+    def test_errors_without_database(self):
+        """Страница 404 не обращается к базе даже у вошедшего
+        пользователя, адрес экранируется."""
+        self.client.force_login(self.user)
+        with self.assertNumQueries(0):
+            response = self.client.get('/missing/<b>/')
+        self.assertContains(
+            response, '/missing/&lt;b&gt;/', status_code=404
+        )
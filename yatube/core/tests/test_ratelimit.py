@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from ..ratelimit import hit, ratelimit
+
+
+@override_settings(RATELIMITS={
+    'posts:add_comment': {'rate': '2/m', 'key': 'user'},
+    'users:login': {'rate': '1/m', 'key': 'ip'},
+})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_per_user(self):
+        """Третий комментарий за минуту получает 429 с Retry-After,
+        другой пользователь считается отдельно."""
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        client = Client()
+        client.force_login(self.author)
+        for _ in range(2):
+            self.assertEqual(client.post(url, {'text': 'Ок'}).status_code,
+                             302)
+        response = client.post(url, {'text': 'Ок'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        self.assertEqual(other.post(url, {'text': 'Ок'}).status_code, 302)
+        # GET-запросы правило не учитывает
+        self.assertNotEqual(client.get(url).status_code, 429)
+
+    def test_limit_per_ip(self):
+        url = reverse('users:login')
+        data = {'username': 'author', 'password': 'wrong'}
+        self.client.post(url, data, REMOTE_ADDR='10.0.0.1')
+        response = self.client.post(url, data, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(url, data, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    def test_decorator(self):
+        view = ratelimit('1/h', key='ip', methods=('GET',))(
+            lambda request: HttpResponse('ok')
+        )
+        request = RequestFactory().get('/')
+        self.assertEqual(view(request).status_code, 200)
+        self.assertEqual(view(request).status_code, 429)
+        with override_settings(RATELIMIT_ENABLED=False):
+            self.assertEqual(view(request).status_code, 200)
+
+    def test_sliding_window(self):
+        """Прошлое окно учитывается долей, которая еще не вышла из
+        последних period секунд: на стыке минут клиент не получает
+        двойной лимит."""
+        with mock.patch('core.ratelimit.time.time') as now:
+            now.return_value = 59.0
+            self.assertEqual(
+                [hit('bucket', 'client', '2/m') for _ in range(3)],
+                [None, None, 1]
+            )
+            now.return_value = 61.0
+            self.assertEqual(hit('bucket', 'client', '2/m'), 29)
+            now.return_value = 90.0
+            self.assertIsNone(hit('bucket', 'client', '2/m'))
+            self.assertEqual(hit('bucket', 'client', '2/m'), 30)
@@ -0,0 +1,77 @@
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.models import Post, User
+
+from ..middleware import ReplicaPinMiddleware
+from ..routers import PrimaryReplicaRouter, is_pinned, pin_primary, set_pinned
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class PrimaryReplicaRouterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.router = PrimaryReplicaRouter()
+
+    def setUp(self):
+        set_pinned(False)
+
+    def test_reads_go_to_replica(self):
+        """Чтение постов идет в реплику, запись в основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_sessions_read_from_primary(self):
+        """Сессии и пользователи всегда читаются из основной базы."""
+        self.assertIsNone(self.router.db_for_read(Session))
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def read_alias(self, request):
+        aliases = []
+
+        def view(request):
+            aliases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        ReplicaPinMiddleware(view)(request)
+        self.assertFalse(is_pinned())
+        return aliases[0]
+
+    def test_write_pins_user_to_primary(self):
+        """После записи чтения пользователя закреплены за основной
+        базой в любом процессе: закрепление едет в подписанной cookie."""
+        request = RequestFactory().post('/')
+        request.user = self.user
+        response = pin_primary(lambda request: HttpResponse())(request)
+        set_pinned(False)
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertEqual(self.read_alias(request), 'replica')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = cookie.value
+        self.assertIsNone(self.read_alias(request))
+        # Чужая cookie закрепления не дает
+        request.user = User.objects.create_user(username='other')
+        self.assertEqual(self.read_alias(request), 'replica')
+
+    def test_get_form_not_pinned(self):
+        """Показ формы не закрепляет, запись по GET с редиректом —
+        закрепляет."""
+        request = RequestFactory().get('/')
+        request.user = self.user
+        response = pin_primary(lambda request: HttpResponse())(request)
+        self.assertFalse(is_pinned())
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        response = pin_primary(
+            lambda request: HttpResponseRedirect('/')
+        )(request)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_replica(self):
+        """Без реплики маршрутизатор ничего не меняет."""
+        self.assertIsNone(self.router.db_for_read(Post))
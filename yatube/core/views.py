@@ -1,24 +1,19 @@
 from http import HTTPStatus
 
-from django.shortcuts import render
+from .prerender import serve
 
 
 def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
+    return serve(request, '403csrf', HTTPStatus.FORBIDDEN)
 
 
 def page_not_found(request, exception):
-    return render(
-        request,
-        'core/404.html', {'path': request.path},
-        status=HTTPStatus.NOT_FOUND
-    )
+    return serve(request, '404', HTTPStatus.NOT_FOUND)
 
 
 def permission_denied(request, exception):
-    return render(request, 'core/403.html', status=HTTPStatus.FORBIDDEN)
+    return serve(request, '403', HTTPStatus.FORBIDDEN)
 
 
 def server_error(request):
-    return render(request, 'core/500.html',
-                  status=HTTPStatus.INTERNAL_SERVER_ERROR)
+    return serve(request, '500', HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -0,0 +1,175 @@
+from collections import defaultdict
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+
+from .models import ArchivedComment, ArchivedPost, Comment, Group, Post, User
+from .sharding import shard_for_post, sharding_enabled
+from .threads import parent_id
+from .utils import keyset_page
+
+# Имя поля в ответе и путь для values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = (
+    'id', 'author__username', 'text', 'pub_date', 'path', 'depth'
+)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+def json_view(view):
+    """JSON-ответ с ETag по содержимому. При совпадении If-None-Match
+    клиент получает 304 без тела."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+        response = JsonResponse(data, json_dumps_params={
+            'ensure_ascii': False
+        })
+        set_response_etag(response)
+        return get_conditional_response(
+            request, etag=response['ETag'], response=response
+        )
+
+    return wrapper
+
+
+def projection(request):
+    """Поля из параметра fields=id,text; по умолчанию все."""
+    names = request.GET.get('fields')
+    if not names:
+        return list(POST_FIELDS)
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = set(names) - set(POST_FIELDS)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return names
+
+
+def rows(queryset, names):
+    """Строки values() без создания моделей. id и pub_date читаются
+    всегда: по ним строится курсор."""
+    lookups = {POST_FIELDS[name] for name in names} | {'id', 'pub_date'}
+    return queryset.values(*lookups)
+
+
+def present(row, names):
+    result = {name: row[POST_FIELDS[name]] for name in names}
+    if result.get('image'):
+        result['image'] = settings.MEDIA_URL + result['image']
+    return result
+
+
+def feed_page(request, hot, cold):
+    names = projection(request)
+    posts, next_cursor = keyset_page(
+        rows(hot, names), request.GET.get('cursor'),
+        archive=rows(cold, names)
+    )
+    return {
+        'results': [present(post, names) for post in posts],
+        'next': next_cursor,
+    }
+
+
+def get_or_error(queryset, **kwargs):
+    obj = queryset.filter(**kwargs).first()
+    if obj is None:
+        raise ApiError('Не найдено', HTTPStatus.NOT_FOUND)
+    return obj
+
+
+@json_view
+def feed(request):
+    return feed_page(request, Post.objects.all(), ArchivedPost.objects.all())
+
+
+@json_view
+def group_feed(request, slug):
+    group = get_or_error(Group.objects.only('pk'), slug=slug)
+    return feed_page(
+        request, Post.objects.filter(group=group),
+        ArchivedPost.objects.filter(group=group)
+    )
+
+
+@json_view
+def profile_feed(request, username):
+    author = get_or_error(User.objects.only('pk'), username=username)
+    return feed_page(
+        request, Post.objects.for_author(author),
+        ArchivedPost.objects.for_author(author)
+    )
+
+
+@json_view
+def post_detail(request, post_id):
+    """Пост со списком комментариев."""
+    names = projection(request)
+    for model, comments in ((Post, Comment), (ArchivedPost, ArchivedComment)):
+        row = rows(model.objects.for_post_id(post_id), names).first()
+        if row is not None:
+            break
+    else:
+        raise ApiError('Не найдено', HTTPStatus.NOT_FOUND)
+    result = present(row, names)
+    queryset = comments.objects.filter(post_id=post_id)
+    if sharding_enabled():
+        queryset = queryset.using(shard_for_post(post_id))
+    result['comments'] = [
+        {
+            'id': comment['id'],
+            'author': comment['author__username'],
+            'text': comment['text'],
+            'pub_date': comment['pub_date'],
+            'parent': parent_id(comment['path']),
+            'depth': comment['depth'],
+        }
+        for comment in queryset.order_by('path').values(*COMMENT_FIELDS)
+    ]
+    return result
+
+
+@json_view
+def posts_batch(request):
+    """Несколько постов по ids=1,2,3 за один вызов: один запрос на базу,
+    посты, которых нет в основной таблице, дочитываются из архива."""
+    names = projection(request)
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        raise ApiError('ids должен быть списком чисел')
+    if len(ids) > settings.API_BATCH_LIMIT:
+        raise ApiError(f'Не больше {settings.API_BATCH_LIMIT} ids')
+    found = {}
+    for model in (Post, ArchivedPost):
+        missing = [pk for pk in ids if pk not in found]
+        if not missing:
+            break
+        by_shard = defaultdict(list)
+        for pk in missing:
+            by_shard[
+                shard_for_post(pk) if sharding_enabled() else None
+            ].append(pk)
+        for alias, shard_ids in by_shard.items():
+            queryset = model.objects.using(alias).filter(pk__in=shard_ids)
+            for row in rows(queryset, names):
+                found[row['id']] = present(row, names)
+    return {'results': [found[pk] for pk in ids if pk in found]}
@@ -1,5 +1,49 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from core.pagecache import bump_generation
+
+        from .archive import forget_follow_count
+        from .following import check_following_cache, forget_following
+        from .pages import forget_comment_pages, forget_post_pages
+        from .sharding import delete_reference, replicate_reference
+        from .threads import (forget_comment, mark_deleted_post,
+                              remember_comment, unmark_deleted_post)
+
+        check_following_cache()
+        for model in (get_user_model(), self.get_model('Group')):
+            post_save.connect(replicate_reference, sender=model)
+            post_delete.connect(delete_reference, sender=model)
+        follow = self.get_model('Follow')
+        post_save.connect(forget_following, sender=follow)
+        post_delete.connect(forget_following, sender=follow)
+        post_save.connect(forget_follow_count, sender=follow)
+        post_delete.connect(forget_follow_count, sender=follow)
+        # Скелеты страниц устаревают при изменении того, что они выводят:
+        # пользователи и группы видны везде, посты и комментарии — только
+        # на страницах своих семейств
+        receivers = {
+            get_user_model(): bump_generation,
+            self.get_model('Group'): bump_generation,
+            self.get_model('Post'): forget_post_pages,
+            self.get_model('ArchivedPost'): forget_post_pages,
+            self.get_model('Comment'): forget_comment_pages,
+            self.get_model('ArchivedComment'): forget_comment_pages,
+        }
+        for model, receiver in receivers.items():
+            post_save.connect(receiver, sender=model)
+            post_delete.connect(receiver, sender=model)
+        comment = self.get_model('Comment')
+        post_save.connect(remember_comment, sender=comment)
+        post_delete.connect(forget_comment, sender=comment)
+        for name in ('Post', 'ArchivedPost'):
+            pre_delete.connect(mark_deleted_post, sender=self.get_model(name))
+            post_delete.connect(
+                unmark_deleted_post, sender=self.get_model(name)
+            )
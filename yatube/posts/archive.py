@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .sharding import len_or_count, sharded
+from .threads import deleting_posts
+
+GENERATION_KEY = 'archive:generation'
+
+
+class HotColdFeed:
+    """Лента из двух частей: свежие посты из Post и старые из архива.
+    Все архивные посты старше горячих, поэтому архив читается только
+    на страницах за границей горячей части. Число архивных постов
+    кешируется до следующего запуска archive_posts."""
+
+    ordered = True
+
+    def __init__(self, hot, cold, cold_key):
+        self.hot = hot
+        self.cold = cold
+        self.cold_key = cold_key
+        self._hot_count = None
+        self._count = None
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = len_or_count(self.hot)
+        return self._hot_count
+
+    def count(self):
+        if self._count is None:
+            cold_count = cache.get_or_set(
+                self.cold_key, lambda: len_or_count(self.cold),
+                settings.ARCHIVE_COUNT_TIMEOUT
+            )
+            self._count = self.hot_count() + cold_count
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        boundary = self.hot_count()
+        posts = list(self.hot[start:stop]) if start < boundary else []
+        if stop > boundary:
+            posts.extend(
+                self.cold[max(start - boundary, 0):stop - boundary]
+            )
+        return posts
+
+
+def count_key(feed):
+    generation = cache.get(GENERATION_KEY, 0)
+    return f'archive:count:{generation}:{feed}'
+
+
+def with_archive(hot, cold, feed):
+    """Оборачивает горячий и архивный queryset одной ленты. feed —
+    имя ленты в ключе кеша числа архивных постов: 'home', 'group:<id>',
+    'author:<id>' или 'follow:<id пользователя>'."""
+    return HotColdFeed(sharded(hot), sharded(cold), count_key(feed))
+
+
+def forget_follow_count(instance, **kwargs):
+    """Подписка и отписка меняют архивную часть ленты подписок."""
+    cache.delete(count_key(f'follow:{instance.user_id}'))
+
+
+def archive_batch(alias, cutoff, batch_size):
+    """Переносит в архив до batch_size самых старых постов базы alias
+    вместе с комментариями. Возвращает число перенесенных постов."""
+    with transaction.atomic(using=alias):
+        posts = list(
+            Post.objects.using(alias).filter(pub_date__lt=cutoff)
+            .order_by('pub_date', 'pk')[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post.pk for post in posts]
+        ArchivedPost.objects.using(alias).bulk_create(
+            ArchivedPost(
+                id=post.pk,
+                author_id=post.author_id,
+                group_id=post.group_id,
+                image=post.image,
+                pub_date=post.pub_date,
+                text=post.text,
+                comment_count=post.comment_count,
+            ) for post in posts
+        )
+        comments = Comment.objects.using(alias).filter(post_id__in=ids)
+        ArchivedComment.objects.using(alias).bulk_create(
+            ArchivedComment(
+                id=comment.pk,
+                author_id=comment.author_id,
+                post_id=comment.post_id,
+                pub_date=comment.pub_date,
+                text=comment.text,
+                path=comment.path,
+                depth=comment.depth,
+                child_count=comment.child_count,
+            ) for comment in comments.iterator()
+        )
+        with deleting_posts(ids):
+            comments.delete()
+        Post.objects.using(alias).filter(pk__in=ids).delete()
+    return len(posts)
+
+
+def bump_generation():
+    """Сбрасывает закешированные размеры архивных лент."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
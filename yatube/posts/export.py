@@ -0,0 +1,103 @@
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ArchivedComment, ArchivedPost, Comment, Follow, Post
+
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+
+class StreamBuffer:
+    """Файлоподобный буфер без seek: zipfile пишет в него,
+    генератор сразу забирает записанные байты."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_records(user):
+    """Записи пользователя по одной: посты, комментарии, подписки.
+    Строки читаются из базы порциями, без загрузки всего набора."""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    # Архивные посты и комментарии выгружаются наравне с текущими
+    for model in (Post, ArchivedPost):
+        posts = model.objects.for_author(user).order_by('pk').values(
+            'id', 'text', 'pub_date', 'group__slug', 'image'
+        )
+        for post in posts.iterator(chunk_size=chunk_size):
+            yield {
+                'type': 'post',
+                'id': post['id'],
+                'text': post['text'],
+                'pub_date': post['pub_date'],
+                'group': post['group__slug'],
+                'image': post['image'] or None,
+            }
+    # Комментарии лежат рядом с постами, к которым написаны
+    for model in (Comment, ArchivedComment):
+        for alias in settings.POST_SHARDS:
+            comments = model.objects.using(alias).filter(
+                author=user
+            ).order_by('pk').values('id', 'post_id', 'text', 'pub_date')
+            for comment in comments.iterator(chunk_size=chunk_size):
+                yield {'type': 'comment', **comment}
+    follows = Follow.objects.filter(user=user).order_by('pk').values_list(
+        'author__username', flat=True
+    )
+    for username in follows.iterator(chunk_size=chunk_size):
+        yield {'type': 'follow', 'author': username}
+
+
+def iter_jsonl(user):
+    """Выгрузка в формате JSON Lines: одна запись на строку."""
+    for record in export_records(user):
+        line = json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield (line + '\n').encode()
+
+
+def iter_zip(user, include_images=False):
+    """Zip-архив с data.jsonl и, по желанию, исходными картинками постов.
+    Архив пишется в потоковом режиме, файлы копируются кусками."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('data.jsonl', 'w') as dest:
+            for line in iter_jsonl(user):
+                dest.write(line)
+                yield buffer.pop()
+        if include_images:
+            yield from _iter_images(archive, buffer, user)
+    yield buffer.pop()
+
+
+def _iter_images(archive, buffer, user):
+    for model in (Post, ArchivedPost):
+        images = model.objects.for_author(user).exclude(image='').order_by(
+            'pk'
+        ).values_list('image', flat=True)
+        for name in images.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            try:
+                source = default_storage.open(name, 'rb')
+            except OSError:
+                # Файл мог пропасть из хранилища, запись остается
+                continue
+            with source, archive.open(f'images/{name}', 'w') as dest:
+                for chunk in iter(
+                    lambda: source.read(IMAGE_CHUNK_SIZE), b''
+                ):
+                    dest.write(chunk)
+                    yield buffer.pop()
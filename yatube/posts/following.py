@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from core.auth import LOCAL_CACHES
+
+from .models import Follow
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def check_following_cache():
+    """forget_following сбрасывает кеш одного процесса: остальные
+    воркеры после подписки рисовали бы старую кнопку."""
+    if not settings.FOLLOWING_CACHE_TIMEOUT:
+        return
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f'FOLLOWING_CACHE_TIMEOUT требует общего кеша, а не {backend}'
+        )
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан пользователь.
+    При FOLLOWING_CACHE_TIMEOUT > 0 кешируется, чтобы кнопка подписки
+    в дырке страничного кеша не ходила в базу на каждый запрос."""
+    def load():
+        return set(Follow.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        ))
+
+    timeout = settings.FOLLOWING_CACHE_TIMEOUT
+    if not timeout:
+        return load()
+    return cache.get_or_set(following_key(user.pk), load, timeout)
+
+
+def forget_following(instance, **kwargs):
+    """Сбрасывает кеш подписок при подписке и отписке."""
+    cache.delete(following_key(instance.user_id))
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import InboxMark, Post
+from .sharding import len_or_count, sharded
+from .utils import EPOCH, MICROSECOND
+
+
+def unread_key(user_id):
+    return f'inbox-unread:{user_id}'
+
+
+def last_seen(user):
+    """До этого момента пользователь видел посты своих авторов."""
+    seen = InboxMark.objects.filter(user=user).values_list(
+        'seen', flat=True
+    ).first()
+    return seen or user.date_joined
+
+
+def unread_count(user):
+    """Число новых постов считается по индексу (author, -pub_date)
+    диапазоном от отметки пользователя. Результат кешируется на
+    INBOX_UNREAD_TIMEOUT секунд."""
+    def count():
+        posts = Post.objects.followed_by(user).filter(
+            pub_date__gt=last_seen(user)
+        )
+        return len_or_count(sharded(posts))
+
+    return cache.get_or_set(
+        unread_key(user.pk), count, settings.INBOX_UNREAD_TIMEOUT
+    )
+
+
+def format_moment(moment):
+    return str((moment - EPOCH) // MICROSECOND)
+
+
+def parse_moment(value):
+    """Момент из format_moment, для испорченного значения — None."""
+    try:
+        return EPOCH + timedelta(microseconds=int(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def mark_seen(user, moment):
+    """Сдвигает отметку вперед до moment. Старая вкладка входящих
+    не возвращает отметку назад."""
+    marks = InboxMark.objects.filter(user=user)
+    if not marks.filter(seen__lt=moment).update(seen=moment):
+        InboxMark.objects.get_or_create(
+            user=user, defaults={'seen': moment}
+        )
+    cache.delete(unread_key(user.pk))
@@ -0,0 +1,192 @@
+"""Лайки постов. Отметки лежат в Like с уникальной парой
+(user, post), число лайков — в LikeCounter по LIKE_COUNTER_SLOTS
+строк на пост: каждый лайк увеличивает случайную строку, поэтому
+одновременные лайки популярного поста редко ждут блокировку одной
+строки. При чтении строки суммируются, суммы кешируются на
+LIKE_COUNT_CACHE_TIMEOUT секунд, compact сворачивает строки."""
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import ArchivedPost, Like, LikeCounter, Post
+from .sharding import shard_for_post, sharding_enabled
+
+
+def count_key(post_id):
+    return f'likes:{post_id}'
+
+
+def bump(post_id, delta):
+    """Прибавляет delta к случайной строке счетчика поста и сбрасывает
+    кеш суммы."""
+    slot = random.randrange(settings.LIKE_COUNTER_SLOTS)
+    counters = LikeCounter.objects.filter(post_id=post_id, slot=slot)
+    if not counters.update(count=F('count') + delta):
+        try:
+            with transaction.atomic():
+                LikeCounter.objects.create(
+                    post_id=post_id, slot=slot, count=delta
+                )
+        except IntegrityError:
+            # Строку успел создать соседний запрос
+            counters.update(count=F('count') + delta)
+    # Еще раз после фиксации: до нее соседний запрос мог закешировать
+    # старую сумму
+    cache.delete(count_key(post_id))
+    transaction.on_commit(lambda: cache.delete(count_key(post_id)))
+
+
+def like(user, post_id):
+    """Ставит лайк. Возвращает False, если он уже стоял."""
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, post_id=post_id)
+            bump(post_id, 1)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unlike(user, post_id):
+    """Снимает лайк. Возвращает False, если его не было."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            bump(post_id, -1)
+    return bool(deleted)
+
+
+def like_counts(post_ids=None):
+    """Число лайков каждого поста из post_ids, по умолчанию всех
+    постов, одним запросом."""
+    counters = LikeCounter.objects.all()
+    if post_ids is not None:
+        counters = counters.filter(post_id__in=post_ids)
+    return dict(
+        counters.values('post_id').order_by().annotate(
+            total=Sum('count')
+        ).values_list('post_id', 'total')
+    )
+
+
+def cached_counts(post_ids):
+    """Суммы из кеша, недостающие — одним запросом like_counts."""
+    keys = {count_key(post_id): post_id for post_id in post_ids}
+    counts = {
+        keys[key]: count for key, count in cache.get_many(keys).items()
+    }
+    missing = [post_id for post_id in post_ids if post_id not in counts]
+    if missing:
+        found = like_counts(missing)
+        fresh = {post_id: found.get(post_id, 0) for post_id in missing}
+        cache.set_many(
+            {count_key(post_id): count for post_id, count in fresh.items()},
+            settings.LIKE_COUNT_CACHE_TIMEOUT
+        )
+        counts.update(fresh)
+    return counts
+
+
+def like_states(user, post_ids):
+    """{id поста: (число лайков, лайкнул ли user)} для всей страницы:
+    суммы из кеша или одним запросом и, для вошедшего пользователя,
+    запрос его отметок."""
+    post_ids = list(post_ids)
+    counts = cached_counts(post_ids)
+    liked = set()
+    if user.is_authenticated and post_ids:
+        liked = set(Like.objects.filter(
+            user=user, post_id__in=post_ids
+        ).values_list('post_id', flat=True))
+    return {
+        post_id: (counts.get(post_id, 0), post_id in liked)
+        for post_id in post_ids
+    }
+
+
+def post_exists(post_id):
+    return (Post.objects.for_post_id(post_id).exists()
+            or ArchivedPost.objects.for_post_id(post_id).exists())
+
+
+def compact(batch_size=1000):
+    """Пересобирает счетчики из отметок: строки каждого поста
+    сворачиваются в строку slot=0 с числом его лайков в Like. Так
+    исправляется и расхождение после удаления пользователя: его
+    лайки удаляются каскадом без bump. Строки поста блокируются,
+    лайки между подсчетом и записью не теряются. Возвращает число
+    пересобранных постов."""
+    rows = dict(
+        LikeCounter.objects.values('post_id').order_by().annotate(
+            rows=Count('pk')
+        ).values_list('post_id', 'rows')
+    )
+    sums = like_counts()
+    likes = dict(
+        Like.objects.values('post_id').order_by().annotate(
+            likes=Count('pk')
+        ).values_list('post_id', 'likes')
+    )
+    post_ids = [
+        post_id for post_id in set(rows) | set(likes)
+        if rows.get(post_id, 0) > 1
+        or sums.get(post_id, 0) != likes.get(post_id, 0)
+    ]
+    for start in range(0, len(post_ids), batch_size):
+        batch = post_ids[start:start + batch_size]
+        with transaction.atomic():
+            for post_id in batch:
+                counters = list(
+                    LikeCounter.objects.select_for_update().filter(
+                        post_id=post_id
+                    ).order_by('slot').values_list('pk', flat=True)
+                )
+                total = Like.objects.filter(post_id=post_id).count()
+                if not counters:
+                    try:
+                        with transaction.atomic():
+                            LikeCounter.objects.create(
+                                post_id=post_id, slot=0, count=total
+                            )
+                    except IntegrityError:
+                        # Строку успел создать лайк, поправит
+                        # следующий запуск
+                        pass
+                    continue
+                LikeCounter.objects.filter(pk__in=counters[1:]).delete()
+                LikeCounter.objects.filter(pk=counters[0]).update(
+                    slot=0, count=total
+                )
+        cache.delete_many([count_key(post_id) for post_id in batch])
+    return len(post_ids)
+
+
+def forget_deleted(batch_size=1000):
+    """Удаляет лайки и счетчики постов, которых нет ни в горячих, ни
+    в архивных таблицах: внешний ключ без ограничения не каскадирует
+    удаление поста. Возвращает число таких постов."""
+    post_ids = list(
+        LikeCounter.objects.order_by().values_list(
+            'post_id', flat=True
+        ).distinct()
+    )
+    deleted = 0
+    for start in range(0, len(post_ids), batch_size):
+        by_alias = defaultdict(list)
+        for post_id in post_ids[start:start + batch_size]:
+            alias = shard_for_post(post_id) if sharding_enabled() else None
+            by_alias[alias].append(post_id)
+        for alias, ids in by_alias.items():
+            missing = set(ids)
+            for post_model in (Post, ArchivedPost):
+                missing -= set(post_model.objects.db_manager(alias).filter(
+                    pk__in=ids
+                ).values_list('pk', flat=True))
+            LikeCounter.objects.filter(post_id__in=missing).delete()
+            Like.objects.filter(post_id__in=missing).delete()
+            deleted += len(missing)
+    return deleted
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.pagecache import bump_generation as bump_pages
+from posts.archive import archive_batch, bump_generation
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты старше --days дней вместе с комментариями '
+            'в архивные таблицы. Работает небольшими транзакциями.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for alias in settings.POST_SHARDS:
+            while True:
+                moved = archive_batch(alias, cutoff, options['batch_size'])
+                total += moved
+                if moved < options['batch_size']:
+                    break
+        if total:
+            bump_generation()
+            # Архивные посты выводятся без ссылки на редактирование
+            bump_pages()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив: {total} постов'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.query_plans import feed_querysets, plan_problems
+
+
+class Command(BaseCommand):
+    help = ('Проверяет EXPLAIN QUERY PLAN запросов лент: без полного '
+            'сканирования таблиц и временной сортировки.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов рассчитана на SQLite')
+        failed = []
+        for name, queryset in feed_querysets().items():
+            plan, problems = plan_problems(name, queryset)
+            self.stdout.write(f'{name}\n{plan}\n')
+            if problems:
+                failed.append(name)
+                for line in problems:
+                    self.stderr.write(f'{name}: {line}')
+        if failed:
+            raise CommandError(
+                f'Неоптимальные планы: {", ".join(failed)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.likes import compact, forget_deleted
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает счетчики лайков в одну строку на пост по '
+            'отметкам и удаляет лайки удаленных постов. Рассчитана на '
+            'запуск по расписанию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        compacted = compact(options['batch_size'])
+        deleted = forget_deleted(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Свернуто счетчиков: {compacted}, '
+            f'удалено постов из лайков: {deleted}'
+        ))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import iter_jsonl, iter_zip
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии и подписки пользователя.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'zip'), default='jsonl'
+        )
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Добавить в zip исходные картинки постов.'
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Путь к файлу, "-" означает stdout.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        if options['format'] == 'zip':
+            chunks = iter_zip(user, options['images'])
+        else:
+            chunks = iter_jsonl(user)
+        if options['output'] == '-':
+            self._write(sys.stdout.buffer, chunks)
+            return
+        with open(options['output'], 'wb') as output:
+            self._write(output, chunks)
+
+    def _write(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
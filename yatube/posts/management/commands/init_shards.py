@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts.models import Comment, Group, Post, User
+from posts.sharding import copy_reference_rows, shard_for_author
+
+
+class Command(BaseCommand):
+    help = ('Готовит базы из POST_SHARDS: схема, диапазоны id '
+            'и копии пользователей и групп.')
+
+    def handle(self, *args, **options):
+        shards = settings.POST_SHARDS
+        if len(shards) == 1:
+            raise CommandError('Шарды не настроены: задайте YATUBE_SHARD_DBS')
+        misplaced = [
+            author_id for author_id in Post.objects.using(shards[0])
+            .values_list('author_id', flat=True).distinct()
+            if shard_for_author(author_id) != shards[0]
+        ]
+        if misplaced:
+            # Перенос старых постов изменил бы их id и ссылки на них
+            raise CommandError(
+                f'В основной базе есть посты {len(misplaced)} авторов, '
+                f'которые по хешу относятся к другим шардам'
+            )
+        for number, alias in enumerate(shards[1:], 1):
+            call_command('migrate', database=alias, verbosity=0)
+            self.reserve_ids(alias, number << settings.POST_ID_SHARD_BITS)
+            self.stdout.write(f'{alias}: схема и диапазон id готовы')
+        copy_reference_rows(User, User.objects.using(shards[0]))
+        copy_reference_rows(Group, Group.objects.using(shards[0]))
+        self.stdout.write(self.style.SUCCESS('Шарды готовы'))
+
+    def reserve_ids(self, alias, base):
+        """Сдвигает AUTOINCREMENT, чтобы id шарда начинались с base."""
+        with connections[alias].cursor() as cursor:
+            for model in (Post, Comment):
+                table = model._meta.db_table
+                cursor.execute(
+                    'SELECT seq FROM sqlite_sequence WHERE name = %s',
+                    [table]
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) '
+                        'VALUES (%s, %s)', [table, base]
+                    )
+                elif row[0] < base:
+                    cursor.execute(
+                        'UPDATE sqlite_sequence SET seq = %s '
+                        'WHERE name = %s', [base, table]
+                    )
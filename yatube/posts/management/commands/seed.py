@@ -0,0 +1,224 @@
+import io
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.sharding import (copy_reference_rows, shard_for_author,
+                            shard_for_post)
+from posts.threads import fill_paths, recount
+
+WORDS = (
+    'блог запись день город утро вечер книга музыка фильм поездка '
+    'работа кофе друзья идея проект код python django море горы '
+    'новость мысль вопрос ответ история планы выходные погода'
+).split()
+IMAGE_VARIANTS = 8
+
+
+@contextmanager
+def explicit_pub_date(*models):
+    """Позволяет задать pub_date вручную, отключив auto_now_add."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой, от 0 до 1.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикаций.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.now = timezone.now()
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            group_ids = self.create_groups(options['groups'])
+            # Активность авторов и популярность распределены по Парето:
+            # немногие пишут и собирают подписчиков больше остальных
+            weights = [
+                self.rng.paretovariate(1.2) for _ in range(len(user_ids))
+            ]
+            self.create_follows(user_ids, weights, options['follows'])
+            with explicit_pub_date(Post, Comment):
+                post_ids = self.create_posts(
+                    user_ids, weights, group_ids,
+                    options['posts'], options['days'], options['images']
+                )
+                self.create_comments(user_ids, post_ids, options['comments'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(user_ids)} пользователей, '
+            f'{len(group_ids)} групп, {len(post_ids)} постов'
+        ))
+
+    def bulk_create(self, model, objects, shard=None):
+        for batch in batched(objects, self.batch_size):
+            if shard is None:
+                model.objects.bulk_create(batch)
+                continue
+            buckets = defaultdict(list)
+            for obj in batch:
+                buckets[shard(obj)].append(obj)
+            for alias, bucket in buckets.items():
+                model.objects.using(alias).bulk_create(bucket)
+
+    def create_users(self, count):
+        password = make_password('password')
+        self.bulk_create(User, (
+            User(
+                username=f'{self.prefix}_user_{i}',
+                first_name=self.rng.choice(WORDS).title(),
+                last_name=self.rng.choice(WORDS).title(),
+                password=password,
+            ) for i in range(count)
+        ))
+        users = User.objects.filter(
+            username__startswith=f'{self.prefix}_user_'
+        ).order_by('pk')
+        # bulk_create не вызывает сигналы, копируем в шарды явно
+        copy_reference_rows(User, users)
+        return list(users.values_list('pk', flat=True))
+
+    def create_groups(self, count):
+        self.bulk_create(Group, (
+            Group(
+                title=f'Группа {i}',
+                slug=f'{self.prefix}-group-{i}',
+                description=self.text(10),
+            ) for i in range(count)
+        ))
+        groups = Group.objects.filter(
+            slug__startswith=f'{self.prefix}-group-'
+        ).order_by('pk')
+        copy_reference_rows(Group, groups)
+        return list(groups.values_list('pk', flat=True))
+
+    def create_follows(self, user_ids, weights, average):
+        if not user_ids:
+            return
+        rng = self.rng
+        pairs = set()
+        for user_id in user_ids:
+            count = min(
+                int(rng.expovariate(1 / average)) if average else 0,
+                len(user_ids) - 1
+            )
+            for author_id in rng.choices(user_ids, weights, k=count):
+                if author_id != user_id:
+                    pairs.add((user_id, author_id))
+        self.bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in sorted(pairs)
+        ))
+
+    def create_posts(self, user_ids, weights, group_ids, count, days, images):
+        if not user_ids:
+            return []
+        rng = self.rng
+        authors = rng.choices(user_ids, weights, k=count)
+        # Даты отсортированы, чтобы порядок id совпадал с хронологией
+        dates = sorted(
+            self.now - timedelta(seconds=rng.random() * days * 86400)
+            for _ in range(count)
+        )
+        image_names = self.create_images() if images else []
+        self.bulk_create(Post, (
+            Post(
+                author_id=author_id,
+                group_id=(
+                    rng.choice(group_ids)
+                    if group_ids and rng.random() < 0.7 else None
+                ),
+                text=self.text(rng.randint(5, 60)),
+                pub_date=pub_date,
+                image=(
+                    rng.choice(image_names)
+                    if image_names and rng.random() < images else ''
+                ),
+            ) for author_id, pub_date in zip(authors, dates)
+        ), shard=lambda post: shard_for_author(post.author_id))
+        posts = []
+        for alias in settings.POST_SHARDS:
+            posts.extend(Post.objects.using(alias).filter(
+                author__username__startswith=f'{self.prefix}_user_'
+            ).order_by('pk').values_list('pk', 'pub_date'))
+        return posts
+
+    def create_comments(self, user_ids, posts, count):
+        if not posts:
+            return
+        rng = self.rng
+        popularity = [rng.paretovariate(1.5) for _ in range(len(posts))]
+        self.bulk_create(Comment, (
+            Comment(
+                author_id=rng.choice(user_ids),
+                post_id=post_id,
+                text=self.text(rng.randint(3, 20)),
+                pub_date=pub_date + (self.now - pub_date) * rng.random(),
+            ) for post_id, pub_date in rng.choices(posts, popularity, k=count)
+        ), shard=lambda comment: shard_for_post(comment.post_id))
+        for alias in settings.POST_SHARDS:
+            fill_paths(Comment.objects.using(alias))
+            recount(alias)
+
+    def create_images(self):
+        names = []
+        for i in range(IMAGE_VARIANTS):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            content = io.BytesIO()
+            Image.new('RGB', (960, 339), color).save(content, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/{self.prefix}_{i}.jpg',
+                ContentFile(content.getvalue())
+            ))
+        return names
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words)).capitalize()
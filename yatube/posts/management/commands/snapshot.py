@@ -0,0 +1,31 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.snapshot import snapshot
+
+
+class Command(BaseCommand):
+    help = ('Обновляет статическую копию страниц групп, профилей '
+            'и постов. Перерисовываются только изменившиеся страницы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.SNAPSHOT_ROOT)
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Размер пула процессов, 1 — рисовать в текущем процессе.'
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Перерисовать все страницы.'
+        )
+
+    def handle(self, *args, **options):
+        rendered, unchanged, removed = snapshot(
+            options['output'], options['processes'], options['full']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Перерисовано: {rendered}, без изменений: {unchanged}, '
+            f'удалено: {removed}'
+        ))
@@ -0,0 +1,83 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_paths(apps, schema_editor):
+    """Существующие комментарии становятся комментариями верхнего
+    уровня: path из собственного id, как в posts.threads.segment."""
+    alias = schema_editor.connection.alias
+    for name in ('Comment', 'ArchivedComment'):
+        model = apps.get_model('posts', name)
+        batch = []
+        for pk in model.objects.using(alias).values_list(
+            'pk', flat=True
+        ).iterator():
+            batch.append(model(pk=pk, path=format(pk, '016x')))
+            if len(batch) == 1000:
+                model.objects.using(alias).bulk_update(batch, ['path'])
+                batch = []
+        model.objects.using(alias).bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedcomment',
+            name='archived_comment_post_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_pub_date_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='child_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='child_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'path'], name='archived_comment_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
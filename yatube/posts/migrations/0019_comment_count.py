@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    """Как posts.threads.recount, на исторических моделях."""
+    alias = schema_editor.connection.alias
+    for post_name, comment_name in (('Post', 'Comment'),
+                                    ('ArchivedPost', 'ArchivedComment')):
+        comments = apps.get_model('posts', comment_name).objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(count=Count('pk'))
+        apps.get_model('posts', post_name).objects.using(alias).update(
+            comment_count=Coalesce(Subquery(comments.values('count')), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_pub_date(apps, schema_editor):
+    """Неправленные посты: время правки совпадает с публикацией."""
+    apps.get_model('posts', 'Post').objects.using(
+        schema_editor.connection.alias
+    ).update(edited=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='edited',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .sharding import (IdList, ShardedQuerySet, shard_for_author,
+                       shard_for_post, sharding_enabled)
+
 User = get_user_model()
 
 
@@ -17,6 +20,34 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(ShardedQuerySet):
+    def for_feed(self):
+        """Посты с авторами и группами, загруженными одним запросом."""
+        return self.select_related('author', 'group')
+
+    def followed_by(self, user):
+        if sharding_enabled():
+            # Подписки лежат только в основной базе
+            authors = Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+            return self.filter(author_id__in=IdList(authors))
+        return self.filter(author__following__user=user)
+
+    def for_author(self, author):
+        """Посты автора из его базы."""
+        queryset = self.filter(author=author)
+        if sharding_enabled():
+            return queryset.using(shard_for_author(author.pk))
+        return queryset
+
+    def for_post_id(self, post_id):
+        queryset = self.filter(pk=post_id)
+        if sharding_enabled():
+            return queryset.using(shard_for_post(post_id))
+        return queryset
+
+
 class Post(models.Model):
     author = models.ForeignKey(
         User,
@@ -42,11 +73,29 @@ class Post(models.Model):
         verbose_name='текст',
         help_text='Напишите свой пост здесь'
     )
+    # Счетчик для карточек ленты, см. posts.threads
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Время последней правки, по нему posts.snapshot находит
+    # измененные посты, не читая текст
+    edited = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -63,8 +112,35 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies'
+    )
     pub_date = models.DateTimeField(auto_now_add=True)
     text = models.TextField()
+    # id предков и самого комментария, см. posts.threads
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    child_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Комментарии поста по времени написания
+            models.Index(
+                fields=['post', 'pub_date'],
+                name='comment_post_pub_date_idx'
+            ),
+            # Ветка и поддерево читаются диапазоном path
+            models.Index(
+                fields=['post', 'path'],
+                name='comment_post_path_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -86,3 +162,164 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='followed'
             )
         ]
+
+
+class Like(models.Model):
+    """Отметка «нравится». post без ограничения внешнего ключа: при
+    переносе в архив id поста сохраняется, и лайки остаются."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='likes'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='liked')
+        ]
+
+
+class LikeCounter(models.Model):
+    """Число лайков поста разложено по LIKE_COUNTER_SLOTS строкам,
+    чтобы одновременные лайки популярного поста не ждали друг друга
+    на одной строке. Читается сумма, команда compact_likes сворачивает
+    строки в одну."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='like_counters'
+    )
+    slot = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'slot'], name='like_counter_slot'
+            )
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендация автора, заполняется командой suggest_follows."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'
+            ),
+        ]
+
+
+class InboxMark(models.Model):
+    """Момент, до которого пользователь просмотрел новые посты
+    своих авторов. Одна строка на пользователя вместо строки
+    на каждое уведомление."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='inbox_mark'
+    )
+    seen = models.DateTimeField()
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесенный командой archive_posts. id сохраняется,
+    поэтому ссылки на пост продолжают работать."""
+    id = models.IntegerField(primary_key=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='группа',
+    )
+    pub_date = models.DateTimeField()
+    text = models.TextField(verbose_name='текст')
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'архивный пост'
+        verbose_name_plural = 'архивные посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date'], name='archived_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='archived_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='archived_group_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    pub_date = models.DateTimeField()
+    text = models.TextField()
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    child_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date'], name='archived_comment_post_idx'
+            ),
+            models.Index(
+                fields=['post', 'path'],
+                name='archived_comment_path_idx'
+            ),
+        ]
@@ -0,0 +1,29 @@
+"""Семейства скелетов страниц постов, см. core.pagecache. Лента
+зависит от 'feed', страница группы — от 'group:<id>', профиль
+и страница поста — от 'author:<id>', и каждая — от 'post:<id>'
+всех показанных постов."""
+from core.pagecache import bump
+
+from .threads import deleted_posts
+
+
+def post_families(post):
+    families = [f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id:
+        families.append(f'group:{post.group_id}')
+    return families
+
+
+def forget_post_pages(instance, **kwargs):
+    """Пост меняет ленту, свою группу, страницы автора и свою.
+    Старую группу при переносе обновляет семейство поста: она
+    зависит от него, пока показывает пост."""
+    bump('feed', *post_families(instance))
+
+
+def forget_comment_pages(instance, **kwargs):
+    """Комментарий меняет только страницы, показывающие его пост.
+    Страницы удаляемого поста сбросит сам пост."""
+    if instance.post_id in deleted_posts.ids:
+        return
+    bump(f'post:{instance.post_id}')
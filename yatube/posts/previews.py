@@ -0,0 +1,46 @@
+"""Последние комментарии под карточками ленты."""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+
+def latest_comments(post_model, alias, ids, size):
+    """До size последних комментариев каждого поста из ids одним
+    запросом вместе с авторами. Django 2.2 не умеет фильтровать
+    по оконной функции, поэтому k-й комментарий поста выбирается
+    подзапросом LIMIT 1 OFFSET k по индексу post_id: читается
+    size строк на пост, а не все комментарии популярных постов."""
+    comment_model = post_model.comments.rel.related_model
+    posts = post_model.objects.using(alias).filter(pk__in=ids)
+    newest = comment_model.objects.filter(
+        post_id=OuterRef('pk')
+    ).order_by('-pk').values('pk')
+    condition = Q()
+    for offset in range(size):
+        condition |= Q(pk__in=posts.annotate(
+            comment_id=Subquery(newest[offset:offset + 1])
+        ).values('comment_id'))
+    return comment_model.objects.using(alias).filter(
+        condition
+    ).select_related('author').order_by('pk')
+
+
+def attach_previews(posts, size=None):
+    """Добавляет постам latest_comments: последние комментарии
+    по порядку написания. Один запрос на каждую базу и таблицу,
+    откуда пришли посты страницы."""
+    size = settings.COMMENT_PREVIEW_SIZE if size is None else size
+    posts = list(posts)
+    groups = defaultdict(list)
+    for post in posts:
+        post.latest_comments = []
+        if post.comment_count and size:
+            groups[type(post), post._state.db].append(post.pk)
+    by_post = defaultdict(list)
+    for (post_model, alias), ids in groups.items():
+        for comment in latest_comments(post_model, alias, ids, size):
+            by_post[post_model, comment.post_id].append(comment)
+    for post in posts:
+        post.latest_comments = by_post[type(post), post.pk]
+    return posts
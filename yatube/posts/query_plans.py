@@ -0,0 +1,53 @@
+import re
+
+from django.conf import settings
+
+from .models import Group, Post, User
+from .threads import thread
+
+# Перебор json_each — это список id из параметра, а не таблица
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+(?! USING| VIRTUAL)( |$)')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+# Лента подписок сливает диапазоны индекса (author, -pub_date) нескольких
+# авторов, и SQLite не умеет делать такое слияние без сортировки.
+# Сортируются только посты избранных авторов, а не вся таблица.
+ALLOWED = {
+    'posts:follow_index': {TEMP_SORT},
+}
+
+
+def feed_querysets():
+    """Запросы, которые выполняют ленты и страница поста.
+    Параметры берутся из первых попавшихся объектов базы."""
+    user = User.objects.filter(follower__isnull=False).first()
+    author = User.objects.filter(posts__isnull=False).first()
+    group = Group.objects.first()
+    post = Post.objects.first()
+    querysets = {'posts:home': Post.objects.for_feed()}
+    if user:
+        querysets['posts:follow_index'] = (
+            Post.objects.followed_by(user).for_feed()
+        )
+    if group:
+        querysets['posts:group_posts'] = group.posts.for_feed()
+    if author:
+        querysets['posts:profile'] = author.posts.for_feed()
+    if post:
+        querysets['posts:post_detail'] = thread(
+            post, settings.COMMENT_PAGE_LEVELS - 1
+        )
+    return querysets
+
+
+def plan_problems(name, queryset):
+    """Строки плана с полным сканированием или временной сортировкой."""
+    plan = queryset[:settings.POSTS_PER_PAGE].explain()
+    allowed = ALLOWED.get(name, set())
+    problems = []
+    for line in plan.splitlines():
+        if FULL_SCAN.search(line):
+            problems.append(line)
+        elif TEMP_SORT in line and TEMP_SORT not in allowed:
+            problems.append(line)
+    return plan, problems
@@ -0,0 +1,114 @@
+import numpy as np
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion
+from .sharding import IdList
+
+
+class FollowGraph:
+    """Граф подписок в формате CSR: подписки пользователя с номером i
+    лежат в indices[indptr[i]:indptr[i + 1]]. Номера плотные, id
+    пользователя по номеру хранится в nodes."""
+
+    def __init__(self, followers, authors):
+        followers = np.asarray(followers, dtype=np.int64)
+        authors = np.asarray(authors, dtype=np.int64)
+        self.nodes, inverse = np.unique(
+            np.concatenate([followers, authors]), return_inverse=True
+        )
+        source = inverse[:len(followers)]
+        target = inverse[len(followers):]
+        order = np.argsort(source, kind='stable')
+        self.indices = target[order]
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(source, minlength=len(self.nodes)),
+            out=self.indptr[1:]
+        )
+        self.popularity = np.bincount(target, minlength=len(self.nodes))
+
+    @classmethod
+    def from_database(cls):
+        pairs = np.array(
+            Follow.objects.values_list('user_id', 'author_id'),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        return cls(pairs[:, 0], pairs[:, 1])
+
+    def following(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def second_hop(self, nodes):
+        """Подписки всех nodes одним массивом, без цикла по Python."""
+        starts = self.indptr[nodes]
+        lengths = self.indptr[nodes + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(lengths.sum())]
+
+    def popularity_scores(self, nodes):
+        """Доля от единицы: упорядочивает кандидатов с равным числом
+        общих связей."""
+        return self.popularity[nodes] / (self.popularity.max() + 1)
+
+    def popular(self, top):
+        """Самые популярные авторы для пользователей без подписок."""
+        nodes = np.argsort(-self.popularity, kind='stable')[:top]
+        nodes = nodes[self.popularity[nodes] > 0]
+        return self.nodes[nodes], self.popularity_scores(nodes)
+
+    def suggest(self, node, top):
+        """Авторы, на которых подписаны авторы пользователя. Оценка —
+        число таких общих связей плюс популярность автора."""
+        following = self.following(node)
+        candidates, mutual = np.unique(
+            self.second_hop(following), return_counts=True
+        )
+        keep = (candidates != node) & ~np.isin(candidates, following)
+        candidates, mutual = candidates[keep], mutual[keep]
+        scores = mutual + self.popularity_scores(candidates)
+        if len(scores) > top:
+            best = np.argpartition(-scores, top - 1)[:top]
+            candidates, scores = candidates[best], scores[best]
+        return self.nodes[candidates], scores
+
+
+def suggestions_for(graph, position, popular, top, user_id):
+    node = position.get(user_id)
+    authors, scores = popular
+    if node is not None and len(graph.following(node)):
+        authors, scores = graph.suggest(node, top)
+    return [
+        FollowSuggestion(
+            user_id=user_id, author_id=int(author), score=float(score)
+        )
+        for author, score in zip(authors, scores)
+        if author != user_id
+    ]
+
+
+def rebuild_suggestions(graph, top, user_ids, batch_size=1000):
+    """Пересчитывает рекомендации для user_ids и удаляет рекомендации
+    остальных пользователей. Строки заменяются порциями по batch_size
+    пользователей, каждая в своей короткой транзакции: SQLite держит
+    единственную блокировку записи, и запись сайта ждет одну порцию,
+    а не весь пересчет. Пользователь видит старую или новую версию
+    своих рекомендаций целиком."""
+    position = {
+        user_id: node for node, user_id in enumerate(graph.nodes.tolist())
+    }
+    popular = graph.popular(top) if len(graph.nodes) else ((), ())
+    total = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        suggestions = [
+            suggestion for user_id in batch
+            for suggestion in suggestions_for(
+                graph, position, popular, top, user_id
+            )
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=IdList(batch)).delete()
+            FollowSuggestion.objects.bulk_create(suggestions)
+        total += len(suggestions)
+    FollowSuggestion.objects.exclude(user_id__in=IdList(user_ids)).delete()
+    return total
@@ -0,0 +1,215 @@
+import heapq
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+
+_executor = None
+
+
+def sharding_enabled():
+    return len(settings.POST_SHARDS) > 1
+
+
+def shard_for_author(author_id):
+    """Посты и комментарии к ним живут в базе, выбранной по автору поста."""
+    shards = settings.POST_SHARDS
+    return shards[author_id % len(shards)]
+
+
+def shard_for_post(post_id):
+    """Номер базы зашит в старшие биты id, см. команду init_shards."""
+    index = post_id >> settings.POST_ID_SHARD_BITS
+    shards = settings.POST_SHARDS
+    return shards[index] if index < len(shards) else shards[0]
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=len(settings.POST_SHARDS),
+            thread_name_prefix='shard'
+        )
+    return _executor
+
+
+def scatter(function, items):
+    """Выполняет function для каждой базы параллельно. Внутри транзакции
+    базы обходятся по очереди: соединения других потоков не видят ее
+    незафиксированных изменений."""
+    items = list(items)
+    if len(items) == 1 or in_transaction():
+        return [function(item) for item in items]
+    return list(executor().map(function, items))
+
+
+def in_transaction():
+    return any(
+        connections[alias].in_atomic_block for alias in settings.POST_SHARDS
+    )
+
+
+class ShardedFeed:
+    """Лента из нескольких баз: каждая база отдает свою верхушку ленты,
+    результаты сливаются по (pub_date, id) в порядке убывания.
+    Поддерживает count() и срезы, поэтому подходит для Paginator."""
+
+    ordered = True
+
+    def __init__(self, querysets):
+        self.querysets = list(querysets)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = sum(scatter(len_or_count, self.querysets))
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        parts = scatter(lambda queryset: list(queryset[:stop]), self.querysets)
+        merged = heapq.merge(*parts, key=sort_key, reverse=True)
+        return [post for _, post in zip(range(stop), merged)][start:]
+
+
+def sort_key(post):
+    """Ключ порядка ленты для модели или строки values()."""
+    if isinstance(post, dict):
+        return post['pub_date'], post['id']
+    return post.pub_date, post.pk
+
+
+def len_or_count(object_list):
+    if isinstance(object_list, QuerySet):
+        return object_list.count()
+    return len(object_list)
+
+
+def sharded(queryset):
+    """Одна база или queryset уже привязан к базе: queryset как есть,
+    иначе сбор ленты со всех баз."""
+    if not sharding_enabled() or queryset._db is not None:
+        return queryset
+    return ShardedFeed(
+        queryset.using(alias) for alias in settings.POST_SHARDS
+    )
+
+
+class IdList(RawSQL):
+    """Список id одним параметром запроса для фильтра __in: SQLite
+    ограничивает число параметров, а список подписок не ограничен."""
+
+    def __init__(self, ids):
+        super().__init__(
+            'SELECT value FROM json_each(%s)', [json.dumps(list(ids))]
+        )
+
+    def as_sql(self, compiler, connection):
+        # Скобки вокруг подзапроса ставит сам фильтр __in, вторые
+        # превратили бы подзапрос в одно значение
+        return self.sql, self.params
+
+
+class ShardedQuerySet(QuerySet):
+    def for_id(self, pk):
+        """Объект по id из его базы."""
+        queryset = self.filter(pk=pk)
+        if sharding_enabled():
+            return queryset.using(shard_for_post(pk))
+        return queryset
+
+    def create(self, **kwargs):
+        """QuerySet.create пишет в базу queryset, а не объекта: без явного
+        using() база выбирается маршрутизатором по самому объекту."""
+        if not sharding_enabled() or self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True)
+        return obj
+
+
+class AuthorShardRouter:
+    """Запись постов и комментариев в базу автора поста. Чтение
+    по конкретному объекту идет в базу, откуда он загружен."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if sharding_enabled() and instance is not None:
+            return instance._state.db
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not sharding_enabled():
+            return None
+        instance = hints.get('instance')
+        # При присвоении внешнего ключа hint содержит связанный объект
+        if not isinstance(instance, model):
+            return None
+        # Новому объекту _state.db выставляет присвоение внешнего ключа,
+        # поэтому учитывается только база уже сохраненного объекта
+        if instance._state.db and not instance._state.adding:
+            return instance._state.db
+        label = model._meta.label
+        if label == 'posts.Post':
+            return shard_for_author(instance.author_id)
+        if label == 'posts.Comment':
+            post_field = model._meta.get_field('post')
+            if post_field.is_cached(instance) and instance.post._state.db:
+                return instance.post._state.db
+            return shard_for_post(instance.post_id)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Пользователи и группы копируются во все базы
+        return True if sharding_enabled() else None
+
+
+def replicate_reference(sender, instance, using, raw=False, **kwargs):
+    """Пользователи и группы нужны во всех базах для внешних ключей."""
+    if raw or not sharding_enabled() or using != settings.POST_SHARDS[0]:
+        return
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in sender._meta.concrete_fields if not field.primary_key
+    }
+    for alias in settings.POST_SHARDS[1:]:
+        sender.objects.using(alias).update_or_create(
+            pk=instance.pk, defaults=values
+        )
+
+
+def delete_reference(sender, instance, using, **kwargs):
+    if not sharding_enabled() or using != settings.POST_SHARDS[0]:
+        return
+    for alias in settings.POST_SHARDS[1:]:
+        sender.objects.using(alias).filter(pk=instance.pk).delete()
+
+
+def copy_reference_rows(model, queryset, batch_size=1000):
+    """Копирует строки справочной таблицы из основной базы в шарды."""
+    batch = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) == batch_size:
+            _bulk_copy(model, batch)
+            batch = []
+    if batch:
+        _bulk_copy(model, batch)
+
+
+def _bulk_copy(model, objects):
+    for alias in settings.POST_SHARDS[1:]:
+        model.objects.using(alias).bulk_create(
+            objects, ignore_conflicts=True
+        )
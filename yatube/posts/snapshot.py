@@ -0,0 +1,282 @@
+"""Статическая копия публичных страниц: группы, профили и посты.
+Для каждой страницы считается отпечаток данных, которые она выводит.
+Отпечатки прошлого запуска лежат в manifest.json, перерисовываются
+только страницы с изменившимся отпечатком. Страница ?page=N лежит
+рядом с первой как page-N.html.
+
+Отпечатки строятся по подписям постов из базы, без текстов
+и комментариев: правку выдает edited, комментарии — их число и id
+последнего. Посты читаются потоком, в памяти держится одна пачка
+страниц. Переименование комментатора отпечатки не меняет, такие
+страницы обновляет --full."""
+import hashlib
+import heapq
+import json
+import os
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, groupby, islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.db.models import Count, Max
+from django.http import HttpRequest, QueryDict
+from django.urls import resolve, reverse
+
+from .likes import like_counts
+from .models import (ArchivedComment, ArchivedPost, Comment, Group, Post,
+                     User)
+
+MANIFEST = 'manifest.json'
+POST_VALUES = ('id', 'author_id', 'group_id', 'image', 'pub_date',
+               'comment_count')
+# Подпись поста: откуда он прочитан и что из него выводится
+Row = namedtuple('Row', ('alias', 'archived', *POST_VALUES, 'edited'))
+# Сколько страниц процесс пула рисует за одно задание
+BATCH_SIZE = 50
+
+
+def templates_digest():
+    """Хеш всех шаблонов: после их изменения перерисовывается все."""
+    digest = hashlib.md5()
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, directory).encode())
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+    return digest.hexdigest()
+
+
+def fingerprint(source):
+    return hashlib.md5(
+        json.dumps(source, default=str, ensure_ascii=False).encode()
+    ).hexdigest()
+
+
+def signed(rows, alias, archived):
+    for row in rows.iterator():
+        yield Row(alias, archived, *row)
+
+
+def post_rows(*order, **filters):
+    """Подписи горячих и архивных постов всех баз. С order каждый
+    поток упорядочен в базе по убыванию полей order, потоки сливаются
+    с сохранением порядка. Архивные посты не правятся, их edited —
+    время публикации."""
+    streams = []
+    for alias in settings.POST_SHARDS:
+        for post_model, edited in ((Post, 'edited'),
+                                   (ArchivedPost, 'pub_date')):
+            rows = post_model.objects.using(alias).filter(
+                **filters
+            ).order_by(*(f'-{field}' for field in order)).values_list(
+                *POST_VALUES, edited
+            )
+            streams.append(signed(rows, alias, post_model is ArchivedPost))
+    if not order:
+        return chain.from_iterable(streams)
+
+    def key(row):
+        return tuple(getattr(row, field) for field in order)
+
+    return heapq.merge(*streams, key=key, reverse=True)
+
+
+def totals(field):
+    """Число постов каждой ленты: {значение field: число}."""
+    counts = Counter()
+    for alias in settings.POST_SHARDS:
+        for post_model in (Post, ArchivedPost):
+            counts.update(dict(
+                post_model.objects.using(alias).values(field).order_by()
+                .annotate(posts=Count('pk')).values_list(field, 'posts')
+            ))
+    return counts
+
+
+def feed_pages(rows, feed):
+    """Страницы лент по POSTS_PER_PAGE постов из потока rows,
+    упорядоченного по ленте feed(row): (лента, номер, подписи)."""
+    per_page = settings.POSTS_PER_PAGE
+    for feed_id, feed_rows in groupby(rows, feed):
+        number = 1
+        page = list(islice(feed_rows, per_page))
+        while page:
+            yield feed_id, number, page
+            number += 1
+            page = list(islice(feed_rows, per_page))
+
+
+def batches(items, size):
+    items = iter(items)
+    batch = list(islice(items, size))
+    while batch:
+        yield batch
+        batch = list(islice(items, size))
+
+
+def page_path(url, number):
+    """Путь файла относительно каталога копии."""
+    name = 'index.html' if number == 1 else f'page-{number}.html'
+    return os.path.join(url.strip('/'), name)
+
+
+def cards(rows, groups):
+    """{id поста: что выводит его карточка} для пачки подписей:
+    по запросу лайков и авторов и по запросу последних комментариев
+    на каждую базу и таблицу."""
+    # Копия рисуется анонимом: из лайков видно только их число
+    likes = like_counts([row.id for row in rows])
+    users = {
+        row[0]: row[1:] for row in User.objects.filter(
+            id__in={row.author_id for row in rows}
+        ).values_list('id', 'username', 'first_name', 'last_name')
+    }
+    by_table = defaultdict(list)
+    for row in rows:
+        by_table[row.alias, row.archived].append(row.id)
+    last_comments = {}
+    for (alias, archived), ids in by_table.items():
+        comment_model = ArchivedComment if archived else Comment
+        last_comments.update(
+            comment_model.objects.using(alias).filter(post_id__in=ids)
+            .values('post_id').order_by().annotate(last=Max('pk'))
+            .values_list('post_id', 'last')
+        )
+    return {
+        row.id: (
+            row, users[row.author_id], groups.get(row.group_id, (None,))[0],
+            last_comments.get(row.id), likes.get(row.id, 0)
+        ) for row in rows
+    }
+
+
+def feeds(pages, groups):
+    """Страницы лент с карточками. Подписи одной пачки страниц
+    дополняются разом."""
+    for batch in batches(pages, BATCH_SIZE):
+        shown = cards([row for _, _, page in batch for row in page], groups)
+        for feed_id, number, page in batch:
+            yield feed_id, number, [shown[row.id] for row in page]
+
+
+def plan():
+    """Все страницы копии с отпечатками."""
+    groups = {
+        row[0]: row[1:] for row in
+        Group.objects.values_list('id', 'slug', 'title', 'description')
+    }
+    group_posts, author_posts = totals('group_id'), totals('author_id')
+    empty_groups = set(groups)
+    for group_id, number, page in feeds(feed_pages(
+        post_rows('group_id', 'pub_date', 'id', group__isnull=False),
+        lambda row: row.group_id
+    ), groups):
+        empty_groups.discard(group_id)
+        group = groups[group_id]
+        url = reverse('posts:group_posts', args=[group[0]])
+        yield page_path(url, number), url, number, fingerprint(
+            [group, group_posts[group_id], number, page]
+        )
+    for group_id in empty_groups:
+        url = reverse('posts:group_posts', args=[groups[group_id][0]])
+        yield page_path(url, 1), url, 1, fingerprint(
+            [groups[group_id], 0, 1, []]
+        )
+    for author_id, number, page in feeds(feed_pages(
+        post_rows('author_id', 'pub_date', 'id'), lambda row: row.author_id
+    ), groups):
+        author = page[0][1]
+        url = reverse('posts:profile', args=[author[0]])
+        yield page_path(url, number), url, number, fingerprint(
+            [author, author_posts[author_id], number, page]
+        )
+    for batch in batches(post_rows(), BATCH_SIZE):
+        for card in cards(batch, groups).values():
+            row = card[0]
+            url = reverse('posts:post_detail', args=[row.id])
+            yield page_path(url, 1), url, 1, fingerprint([
+                card, groups.get(row.group_id), author_posts[row.author_id]
+            ])
+
+
+def anonymous_request(url, number):
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = url
+    if number > 1:
+        request.GET = QueryDict(f'page={number}')
+    request.user = AnonymousUser()
+    request.resolver_match = resolve(url)
+    return request
+
+
+def render_batch(root, pages):
+    """Рисует страницы от имени анонима и атомарно пишет файлы."""
+    for path, url, number in pages:
+        request = anonymous_request(url, number)
+        match = request.resolver_match
+        response = match.func(request, *match.args, **match.kwargs)
+        target = os.path.join(root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(f'{target}.tmp', 'wb') as file:
+            file.write(response.content)
+        os.replace(f'{target}.tmp', target)
+    return len(pages)
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'templates': None, 'pages': {}}
+
+
+def snapshot(root, processes=1, full=False):
+    """Обновляет копию в root. processes=1 рисует в текущем процессе,
+    иначе задания по BATCH_SIZE страниц раздаются пулу процессов.
+    Возвращает (перерисовано, без изменений, удалено)."""
+    previous = read_manifest(root)
+    manifest = {'templates': templates_digest(), 'pages': {}}
+    if manifest['templates'] != previous['templates']:
+        full = True
+    dirty = []
+    for path, url, number, digest in plan():
+        manifest['pages'][path] = digest
+        if (full or previous['pages'].get(path) != digest
+                or not os.path.exists(os.path.join(root, path))):
+            dirty.append((path, url, number))
+    batches = [
+        dirty[start:start + BATCH_SIZE]
+        for start in range(0, len(dirty), BATCH_SIZE)
+    ]
+    if processes == 1:
+        for batch in batches:
+            render_batch(root, batch)
+    else:
+        # Дочерние процессы открывают свои соединения с базой
+        connections.close_all()
+        with ProcessPoolExecutor(processes, initializer=django.setup) as pool:
+            # result() пробрасывает ошибки дочерних процессов
+            for future in [pool.submit(render_batch, root, batch)
+                           for batch in batches]:
+                future.result()
+    removed = set(previous['pages']) - set(manifest['pages'])
+    for path in removed:
+        try:
+            os.remove(os.path.join(root, path))
+        except FileNotFoundError:
+            pass
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, f'{MANIFEST}.tmp'), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(
+        os.path.join(root, f'{MANIFEST}.tmp'), os.path.join(root, MANIFEST)
+    )
+    return len(dirty), len(manifest['pages']) - len(dirty), len(removed)
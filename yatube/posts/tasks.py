@@ -0,0 +1,16 @@
+from sorl.thumbnail import get_thumbnail
+
+from .models import Post
+
+# Те же параметры, что у тега thumbnail в шаблонах постов
+POST_THUMBNAIL = ('960x339', {'crop': 'center', 'upscale': True})
+
+
+def warm_thumbnails(post_id):
+    """Готовит миниатюру заранее, чтобы первый показ поста
+    не тратил время на обработку картинки."""
+    post = Post.objects.for_post_id(post_id).first()
+    if post is None or not post.image:
+        return
+    geometry, options = POST_THUMBNAIL
+    get_thumbnail(post.image, geometry, **options)
@@ -0,0 +1,36 @@
+from django import template
+
+from ..following import following_ids
+from ..forms import CommentForm
+from ..likes import like_states
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_id):
+    """Подписан ли пользователь запроса на автора."""
+    user = context['user']
+    return user.is_authenticated and author_id in following_ids(user)
+
+
+@register.simple_tag
+def comment_form():
+    """Пустая форма комментария для дырки страницы поста."""
+    return CommentForm()
+
+
+@register.simple_tag(takes_context=True)
+def like_state(context, post_id, page_ids=None):
+    """(число лайков, лайкнул ли пользователь) для поста. Первая
+    кнопка страницы загружает состояния всех page_ids разом, остальные
+    берут их из запроса: дырки рисуются каждая в своем контексте."""
+    request = context['request']
+    states = getattr(request, 'like_states', None)
+    if states is None:
+        states = request.like_states = {}
+    if post_id not in states:
+        states.update(like_states(
+            context['user'], set(page_ids or ()) | {post_id}
+        ))
+    return states[post_id]
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_batch
+from ..models import Comment, Group, Post, User
+
+
+@override_settings(POSTS_PER_PAGE=3)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            author=cls.author, post=cls.posts[0], text='Комментарий'
+        )
+
+    def walk(self, url, **params):
+        ids = []
+        while True:
+            data = self.client.get(url, params).json()
+            ids.extend(post['id'] for post in data['results'])
+            if data['next'] is None:
+                return ids
+            params['cursor'] = data['next']
+
+    def test_feeds_with_cursor(self):
+        """Ленты отдаются страницами по курсору, включая архив."""
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        archive_batch('default', timezone.now() - timedelta(days=365), 10)
+        newest_first = [post.pk for post in reversed(self.posts)]
+        self.assertEqual(self.walk(reverse('posts:api_feed')), newest_first)
+        self.assertEqual(
+            self.walk(reverse('posts:api_profile', args=['author'])),
+            newest_first
+        )
+        self.assertEqual(
+            self.walk(reverse('posts:api_group', args=['group'])),
+            [self.posts[3].pk, self.posts[1].pk]
+        )
+
+    def test_fields_projection(self):
+        response = self.client.get(
+            reverse('posts:api_feed'), {'fields': 'id,author'}
+        )
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.posts[-1].pk, 'author': 'author'}
+        )
+        response = self.client.get(
+            reverse('posts:api_feed'), {'fields': 'password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        url = reverse('posts:api_post', args=[self.posts[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['comments'][0]['text'], 'Комментарий')
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_batch(self):
+        """Пакетный запрос возвращает посты в порядке ids, читая
+        основную таблицу и архив по одному разу."""
+        ids = [self.posts[2].pk, 999, self.posts[0].pk]
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:api_posts_batch'),
+                {'ids': ','.join(map(str, ids)), 'fields': 'id'}
+            )
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': self.posts[2].pk}, {'id': self.posts[0].pk}]
+        )
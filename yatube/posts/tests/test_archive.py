@@ -0,0 +1,116 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import HotColdFeed
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Post,
+                      User)
+from .utils import single_database
+
+
+class HotColdFeedTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_cross_boundary(self):
+        """Страница на границе берет конец горячей части и начало
+        архива, число архивных записей кешируется."""
+        feed = HotColdFeed(list(range(15)), list(range(15, 40)), 'cold')
+        page = Paginator(feed, 10).get_page(2)
+        self.assertEqual(list(page), list(range(10, 20)))
+        self.assertEqual(page.paginator.count, 40)
+        self.assertEqual(cache.get('cold'), 25)
+        self.assertEqual(feed[0:5], list(range(5)))
+        self.assertEqual(feed[30:40], list(range(30, 40)))
+
+
+@single_database
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.old_posts = [
+            Post.objects.create(author=cls.author, text=f'Старый {i}')
+            for i in range(3)
+        ]
+        cls.new_post = Post.objects.create(author=cls.author, text='Новый')
+        Comment.objects.create(
+            author=cls.author, post=cls.old_posts[0], text='Комментарий'
+        )
+        Post.objects.filter(
+            pk__in=[post.pk for post in cls.old_posts]
+        ).update(pub_date=timezone.now() - timedelta(days=400))
+
+    def setUp(self):
+        cache.clear()
+        call_command('archive_posts', days=365, batch_size=2,
+                     stdout=StringIO())
+
+    def test_command_moves_old_posts(self):
+        """Старые посты и комментарии переезжают в архив с теми же id."""
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list('pk', flat=True)),
+            {post.pk for post in self.old_posts}
+        )
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old_posts[0].pk)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_feeds_include_archive(self):
+        """Ленты показывают архивные посты после свежих."""
+        for url in (reverse('posts:home'),
+                    reverse('posts:profile', args=[self.author.username])):
+            with self.subTest(url=url):
+                page = self.client.get(url).context['page_obj']
+                self.assertEqual(page.paginator.count, 4)
+                self.assertEqual(page[0], self.new_post)
+                self.assertIsInstance(page[1], ArchivedPost)
+
+    def test_archived_post_detail(self):
+        """Старая ссылка на пост открывает архивную запись
+        без формы комментария."""
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old_posts[0].pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_archived'])
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertEqual(response.context['post_count'], 4)
+        self.assertNotContains(
+            response,
+            reverse('posts:add_comment', args=[self.old_posts[0].pk])
+        )
+
+    def test_archive_count_cached(self):
+        """Повторный показ ленты не пересчитывает архив."""
+        self.client.get(reverse('posts:home'))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('posts:home'))
+        self.assertFalse([
+            query for query in context.captured_queries
+            if 'COUNT' in query['sql'] and 'archivedpost' in query['sql']
+        ])
+
+    def test_follow_count_reset(self):
+        """Подписка сбрасывает закешированный размер архивной части
+        ленты подписок."""
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertEqual(
+            self.client.get(url).context['page_obj'].paginator.count, 0
+        )
+        Follow.objects.create(user=reader, author=self.author)
+        self.assertEqual(
+            self.client.get(url).context['page_obj'].paginator.count, 4
+        )
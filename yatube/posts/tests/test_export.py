@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=cls.small_gif,
+                content_type='image/gif'
+            )
+        )
+        Comment.objects.create(
+            author=cls.user, post=cls.post, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_export_jsonl(self):
+        """Выгрузка JSONL отдается потоком и содержит все записи."""
+        response = self.authorized_client.get(reverse('posts:export_data'))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['post', 'comment', 'follow']
+        )
+        self.assertEqual(records[0]['group'], self.group.slug)
+        self.assertEqual(records[2]['author'], self.author.username)
+
+    def test_export_zip_with_images(self):
+        """Zip-архив содержит data.jsonl и исходную картинку поста."""
+        response = self.authorized_client.get(
+            reverse('posts:export_data'), {'format': 'zip', 'images': '1'}
+        )
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertIn('data.jsonl', archive.namelist())
+        self.assertEqual(
+            archive.read(f'images/{self.post.image.name}'), self.small_gif
+        )
+
+    def test_export_requires_login(self):
+        """Аноним перенаправляется на страницу входа."""
+        response = self.client.get(reverse('posts:export_data'))
+        self.assertRedirects(
+            response,
+            reverse('users:login') + '?next=' + reverse('posts:export_data')
+        )
+
+    def test_export_command(self):
+        """Команда export_user пишет выгрузку в файл."""
+        path = os.path.join(TEMP_MEDIA_ROOT, 'export.jsonl')
+        call_command('export_user', self.user.username, output=path)
+        with open(path, encoding='utf-8') as export:
+            self.assertEqual(len(export.readlines()), 3)
@@ -0,0 +1,97 @@
+import re
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.templatetags.feed import page_window
+
+from ..models import Follow, Post, User
+
+MARKER = re.compile(r'class="feed-more" data-url="([^"]+)"')
+
+
+@override_settings(POSTS_PER_PAGE=4)
+class FeedChunkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author if number % 3 else cls.other,
+                text=f'Пост номер {number}'
+            )
+            for number in range(10)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def scroll(self, client, url):
+        """Проходит ленту, как скрипт прокрутки: первая страница,
+        затем порции по ссылкам из меток."""
+        html = client.get(url).content.decode()
+        chunks = 0
+        while True:
+            marker = MARKER.search(html)
+            if marker is None:
+                break
+            chunk = client.get(marker.group(1).replace('&amp;', '&'))
+            self.assertNotContains(chunk, '<html')
+            html = html.replace(marker.group(0), '') + chunk.content.decode()
+            chunks += 1
+        return re.findall(r'Пост номер (\d+)', html), chunks
+
+    def test_scroll_home(self):
+        """Порции продолжают первую страницу без повторов."""
+        numbers, chunks = self.scroll(self.client, reverse('posts:home'))
+        self.assertEqual(numbers, [str(n) for n in range(9, -1, -1)])
+        self.assertEqual(chunks, 2)
+
+    def test_scroll_follow(self):
+        client = Client()
+        client.force_login(self.reader)
+        numbers, _ = self.scroll(client, reverse('posts:follow_index'))
+        self.assertEqual(
+            numbers, [str(n) for n in range(9, -1, -1) if n % 3]
+        )
+        response = self.client.get(
+            reverse('posts:feed_chunk', args=['follow'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_cursor_shares_first_chunk(self):
+        """Испорченные курсоры не плодят записи кеша: все они читают
+        первую порцию по одному ключу."""
+        url = reverse('posts:feed_chunk', args=['home'])
+        for cursor in ('мусор', '1.2.3', '9' * 30 + '.1'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertContains(response, 'Пост номер 9')
+        self.assertIsNotNone(cache.get('feed-chunk:home:None'))
+        self.assertIsNone(cache.get('feed-chunk:home:мусор'))
+
+    def test_follow_page_cached_per_user(self):
+        """Кеш страницы подписок не показывает чужую ленту."""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('posts:follow_index'))
+        client.force_login(self.other)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, 'Пост номер')
+
+
+class PageWindowTest(SimpleTestCase):
+    def test_window(self):
+        """Пагинатор показывает окно страниц, а не все номера."""
+        paginator = Paginator(range(1000), 10)
+        self.assertEqual(
+            page_window(paginator.page(50)),
+            [1, None, 47, 48, 49, 50, 51, 52, 53, None, 100]
+        )
+        self.assertEqual(page_window(paginator.page(2)),
+                         [1, 2, 3, 4, 5, None, 100])
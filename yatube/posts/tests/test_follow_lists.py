@@ -0,0 +1,64 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, User
+
+
+@override_settings(POSTS_PER_PAGE=5)
+class FollowListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.viewer = User.objects.create_user(username='viewer')
+        cls.fans = [
+            User.objects.create_user(username=f'fan_{number}')
+            for number in range(12)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=fan, author=cls.author) for fan in cls.fans
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.viewer, author=fan) for fan in cls.fans[::2]
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.viewer)
+
+    def test_followers_cursor_pages(self):
+        """Подписчики выводятся страницами по курсору без повторов
+        с отметкой, подписан ли на них зритель."""
+        url = reverse('posts:profile_followers', args=[self.author.username])
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(
+                url, {'cursor': cursor} if cursor else {}
+            )
+            for user, is_following in response.context['users']:
+                seen.append(user)
+                self.assertEqual(is_following, user in self.fans[::2])
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.fans[::-1])
+
+    def test_following_page(self):
+        """Подписки выводятся от последней, по POSTS_PER_PAGE."""
+        url = reverse('posts:profile_following', args=[self.viewer.username])
+        response = self.client.get(url)
+        self.assertEqual(
+            [user for user, _ in response.context['users']],
+            self.fans[::2][::-1][:5]
+        )
+
+    def test_constant_queries(self):
+        """Число запросов не зависит от размера страницы: сессия,
+        зритель, автор, страница подписок и отметки зрителя."""
+        url = reverse('posts:profile_followers', args=[self.author.username])
+        self.client.get(url)
+        for per_page in (2, 10):
+            with self.subTest(per_page=per_page):
+                with override_settings(POSTS_PER_PAGE=per_page):
+                    with self.assertNumQueries(5):
+                        self.client.get(url)
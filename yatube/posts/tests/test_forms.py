@@ -1,17 +1,23 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.models import Job
+
 from ..models import Comment, Group, Post, User
+from .utils import single_database
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@single_database
 class PostUrlsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -82,6 +88,19 @@ class PostUrlsTest(TestCase):
             response_for_image.context.get('page_obj')[0].image.name
         )
 
+    def test_create_post_warms_thumbnail(self):
+        """Миниатюра новой картинки готовится фоновой задачей."""
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'image': SimpleUploadedFile(
+                'thumb.gif', self.small_gif, content_type='image/gif'
+            ),
+            'text': 'Пост с картинкой',
+        })
+        job = Job.objects.get(name='posts.tasks.warm_thumbnails')
+        call_command('worker', once=True, threads=1, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE, job.last_error)
+
     def test_edit_post(self):
         """Проверка редактирования поста"""
         group_field = self.group.id
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..inbox import unread_count
+from ..models import Follow, Post, User
+from ..utils import keyset_page
+
+
+class InboxTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_unread_count_uses_watermark(self):
+        """Непрочитанные считаются от отметки, визит во входящие
+        ее сдвигает."""
+        for number in range(3):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        self.assertEqual(unread_count(self.reader), 3)
+        response = self.client.get(reverse('posts:inbox'))
+        self.assertEqual(len(response.context['posts']), 3)
+        self.assertEqual(unread_count(self.reader), 0)
+        Post.objects.create(author=self.author, text='Еще пост')
+        cache.clear()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, reverse('posts:inbox'))
+        self.assertEqual(response.context['inbox_unread'], 1)
+
+    @override_settings(POSTS_PER_PAGE=4)
+    def test_cursor_pages(self):
+        """Курсор проходит ленту без повторов даже при равных датах."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(10)
+        )
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(
+                reverse('posts:inbox'), {'cursor': cursor} if cursor else {}
+            )
+            seen.extend(post.pk for post in response.context['posts'])
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(
+            seen, list(Post.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            ))
+        )
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_unread_beyond_first_page(self):
+        """Новые посты, не поместившиеся на первую страницу, остаются
+        новыми: отметка сдвигается на странице, дошедшей до старой
+        отметки, а плашки «новое» видны и на следующих страницах."""
+        for number in range(5):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        url = reverse('posts:inbox')
+        response = self.client.get(url)
+        self.assertEqual(unread_count(self.reader), 5)
+        pages = [response]
+        while response.context['next_cursor']:
+            self.assertEqual(unread_count(self.reader), 5)
+            response = self.client.get(
+                f'{url}?cursor={response.context["next_cursor"]}'
+                f'&{response.context["moments"]}'
+            )
+            pages.append(response)
+        self.assertEqual(len(pages), 3)
+        for page in pages:
+            self.assertContains(
+                page, 'новое', count=len(page.context['posts'])
+            )
+        self.assertEqual(unread_count(self.reader), 0)
+
+    def test_invalid_cursor_starts_over(self):
+        """Испорченный курсор дает первую страницу."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(
+            keyset_page(Post.objects.all(), 'мусор'), ([post], None)
+        )
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_batch
+from ..likes import compact, forget_deleted, like, like_states, unlike
+from ..models import Like, LikeCounter, Post, User
+from .utils import single_database
+
+
+class LikeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.fans = [
+            User.objects.create_user(username=f'fan_{number}')
+            for number in range(6)
+        ]
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.fans[0])
+
+    def test_like_once(self):
+        """Повторный лайк не считается, снятый лайк уменьшает число."""
+        post_id = self.posts[0].pk
+        self.assertTrue(like(self.fans[0], post_id))
+        self.assertFalse(like(self.fans[0], post_id))
+        like(self.fans[1], post_id)
+        self.assertEqual(
+            like_states(self.fans[0], [post_id]), {post_id: (2, True)}
+        )
+        self.assertTrue(unlike(self.fans[0], post_id))
+        self.assertFalse(unlike(self.fans[0], post_id))
+        self.assertEqual(
+            like_states(self.fans[0], [post_id]), {post_id: (1, False)}
+        )
+
+    @override_settings(LIKE_COUNTER_SLOTS=4)
+    def test_compact(self):
+        """Лайки расходятся по строкам счетчика, compact сворачивает
+        их в одну без потери суммы."""
+        post_id = self.posts[0].pk
+        for fan in self.fans:
+            like(fan, post_id)
+        unlike(self.fans[0], post_id)
+        self.assertLessEqual(
+            LikeCounter.objects.filter(post_id=post_id).count(), 4
+        )
+        compact()
+        self.assertEqual(
+            list(LikeCounter.objects.values_list('post_id', 'slot', 'count')),
+            [(post_id, 0, 5)]
+        )
+        cache.clear()
+        self.assertEqual(like_states(self.fans[0], [post_id])[post_id][0], 5)
+
+    @single_database
+    def test_forget_deleted(self):
+        """Лайки удаленного поста удаляются, архивного — остаются."""
+        archived, deleted = self.posts[:2]
+        for post in (archived, deleted):
+            like(self.fans[0], post.pk)
+        Post.objects.filter(pk=archived.pk).update(
+            pub_date=timezone.now() - timedelta(days=365)
+        )
+        archive_batch('default', timezone.now() - timedelta(days=30), 10)
+        Post.objects.filter(pk=deleted.pk).delete()
+        self.assertEqual(forget_deleted(), 1)
+        self.assertEqual(
+            list(Like.objects.values_list('post_id', flat=True)),
+            [archived.pk]
+        )
+        call_command('compact_likes', stdout=StringIO())
+
+    def test_views(self):
+        """Лайк ставится только POST-запросом и возвращает на страницу,
+        откуда его поставили, чужие адреса заменяются страницей поста."""
+        post = self.posts[0]
+        like_url = reverse('posts:post_like', args=[post.pk])
+        profile_url = reverse('posts:profile', args=[self.author.username])
+        self.assertEqual(self.client.get(like_url).status_code, 405)
+        self.assertFalse(Like.objects.exists())
+        response = self.client.post(like_url, HTTP_REFERER=profile_url)
+        self.assertRedirects(response, profile_url)
+        response = self.client.post(
+            reverse('posts:post_unlike', args=[post.pk]),
+            HTTP_REFERER='https://example.com/'
+        )
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertFalse(Like.objects.exists())
+        missing = reverse('posts:post_like', args=[post.pk + 100])
+        self.assertEqual(self.client.post(missing).status_code, 404)
+        self.assertRedirects(
+            Client().post(like_url),
+            f'{reverse("users:login")}?next={like_url}'
+        )
+
+    def test_csrf(self):
+        """Кнопка лайка — форма с CSRF-токеном, без токена лайк
+        не ставится."""
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertContains(self.client.get(url), 'csrfmiddlewaretoken')
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.fans[0])
+        response = client.post(
+            reverse('posts:post_like', args=[self.posts[0].pk])
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Like.objects.exists())
+
+    def test_deleted_user(self):
+        """Лайки удаленного пользователя пропадают из счетчика после
+        compact."""
+        post_id = self.posts[0].pk
+        for fan in self.fans[:3]:
+            like(fan, post_id)
+        User.objects.filter(pk=self.fans[1].pk).delete()
+        self.assertEqual(compact(), 1)
+        cache.clear()
+        self.assertEqual(like_states(self.fans[0], [post_id])[post_id][0], 2)
+        self.assertEqual(compact(), 0)
+
+    def test_feed_states(self):
+        """Отметки зрителя для всей страницы ленты читаются разом:
+        число запросов не зависит от размера страницы."""
+        like(self.fans[0], self.posts[1].pk)
+        like(self.fans[1], self.posts[2].pk)
+        url = reverse('posts:profile', args=[self.author.username])
+        response = self.client.get(url)
+        self.assertContains(
+            response, reverse('posts:post_unlike', args=[self.posts[1].pk])
+        )
+        self.assertContains(
+            response, reverse('posts:post_like', args=[self.posts[2].pk])
+        )
+        queries = []
+        for per_page in (1, 3):
+            with override_settings(POSTS_PER_PAGE=per_page):
+                cache.clear()
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as captured:
+                    self.client.get(url)
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+
+    @override_settings(PAGE_CACHE_TIMEOUT=60)
+    def test_personal_in_shared_cache(self):
+        """Главная общая для всех, а отметка лайка у каждого своя."""
+        like(self.fans[0], self.posts[0].pk)
+        unlike_url = reverse('posts:post_unlike', args=[self.posts[0].pk])
+        self.assertContains(self.client.get('/'), unlike_url)
+        other = Client()
+        other.force_login(self.fans[1])
+        response = other.get('/')
+        self.assertNotContains(response, unlike_url)
+        self.assertNotContains(response, '<!--hole')
@@ -0,0 +1,117 @@
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.pagecache import check_page_cache, hole_punched
+
+from ..following import check_following_cache
+from ..models import Comment, Follow, Post, User
+from ..threads import save_comment
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_skeleton_shared(self):
+        """Скелет профиля общий, а шапка и кнопка подписки свои
+        у каждого пользователя. Аноним читает страницу из кеша
+        без запросов к базе."""
+        url = reverse('posts:profile', args=[self.author.username])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Подписаться')
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, '<!--hole')
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Отписаться')
+        response = self.author_client.get(url)
+        self.assertNotContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_detail_holes(self):
+        """Ссылка на редактирование видна только автору, форма
+        комментария получает CSRF-токен своего пользователя."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        edit_url = reverse('posts:post_edit', args=[self.post.pk])
+        self.assertNotContains(self.client.get(url), 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertIn('csrftoken', response.cookies)
+        self.assertContains(self.author_client.get(url), edit_url)
+
+    def test_invalidation(self):
+        """Новый пост сбрасывает скелеты, подписка — только кеш
+        подписок пользователя."""
+        profile_url = reverse('posts:profile', args=[self.author.username])
+        self.reader_client.get(profile_url)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertContains(self.client.get(profile_url), 'Свежий пост')
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertContains(self.reader_client.get(profile_url), 'Подписаться')
+
+    def test_scoped_invalidation(self):
+        """Комментарий сбрасывает только страницы, показывающие его
+        пост: профиль другого автора читается из кеша."""
+        other = User.objects.create_user(username='other')
+        other_post = Post.objects.create(author=other, text='Другой пост')
+        profile_url = reverse('posts:profile', args=[self.author.username])
+        other_url = reverse('posts:profile', args=[other.username])
+        self.client.get(profile_url)
+        self.client.get(other_url)
+        save_comment(Comment(
+            post=self.post, author=self.reader, text='Свежий комментарий'
+        ))
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+        self.assertContains(self.client.get(profile_url), 'Свежий комментарий')
+        save_comment(Comment(post=other_post, author=self.reader, text='Еще'))
+        self.assertContains(self.client.get(other_url), 'Еще')
+
+    def test_headers_replayed(self):
+        """Из кеша ответ приходит со статусом и заголовками
+        представления, а само представление не вызывается."""
+        calls = []
+
+        @hole_punched
+        def view(request):
+            calls.append(request)
+            response = HttpResponse('Скелет')
+            response['Cache-Control'] = 'private'
+            return response
+
+        for _ in range(2):
+            response = view(RequestFactory().get('/page/'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'private')
+            self.assertEqual(response.content.decode(), 'Скелет')
+        self.assertEqual(len(calls), 1)
+
+    def test_needs_shared_cache(self):
+        """Кеш страниц и кеш подписок не включаются с кешем одного
+        процесса."""
+        with self.assertRaises(ImproperlyConfigured):
+            check_page_cache()
+        with override_settings(PAGE_CACHE_TIMEOUT=0):
+            check_page_cache()
+        with override_settings(FOLLOWING_CACHE_TIMEOUT=300):
+            with self.assertRaises(ImproperlyConfigured):
+                check_following_cache()
+        check_following_cache()
@@ -0,0 +1,217 @@
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..threads import recount
+from .utils import single_database
+
+AUTHORS = 12
+GROUPS = 4
+POSTS_PER_AUTHOR = 3
+COMMENTS_PER_POST = 2
+
+
+@single_database
+class QueryBudgetTest(TestCase):
+    """Число запросов к базе не должно зависеть от числа постов,
+    авторов и групп на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='viewer')
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {i}',
+                slug=f'group-{i}',
+                description='Описание',
+            ) for i in range(GROUPS)
+        )
+        cls.groups = groups = list(Group.objects.order_by('slug'))
+        cls.group = groups[0]
+        authors = [
+            User.objects.create_user(
+                username=f'author_{i}', first_name='Имя', last_name=str(i)
+            ) for i in range(AUTHORS)
+        ]
+        cls.author = authors[0]
+        # Ленты и группа выводят посты разных групп и авторов
+        posts = [
+            Post.objects.create(
+                author=author,
+                group=groups[(number + i) % GROUPS] if i else None,
+                text=f'Пост {i} автора {author.username}',
+            )
+            for number, author in enumerate(authors)
+            for i in range(POSTS_PER_AUTHOR)
+        ]
+        cls.post = posts[0]
+        Comment.objects.bulk_create(
+            Comment(author=authors[i % AUTHORS], post=cls.post, text='Ок')
+            for i in range(COMMENTS_PER_POST * AUTHORS)
+        )
+        recount('default')
+        cls.comment = cls.post.comments.first()
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author) for author in authors[1:]
+        )
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def setUp(self):
+        # Кеш пуст, поэтому ленты считают архивные посты,
+        # а переключатель лент число непрочитанных
+        cache.clear()
+
+    @contextmanager
+    def assertMaxQueries(self, limit, url):
+        with CaptureQueriesContext(connection) as context:
+            yield
+        executed = len(context.captured_queries)
+        if executed > limit:
+            statements = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f'{url}: {executed} запросов к базе при бюджете {limit}\n'
+                f'{statements}'
+            )
+
+    def check_budgets(self, client, budgets, method='get', data=None):
+        for url, (max_queries, max_bytes) in budgets.items():
+            with self.subTest(url=url):
+                with self.assertMaxQueries(max_queries, url):
+                    response = getattr(client, method)(url, data)
+                    # Потоковый ответ читает базу по мере отдачи
+                    content = (
+                        b''.join(response.streaming_content)
+                        if response.streaming else response.content
+                    )
+                self.assertLessEqual(
+                    len(content), max_bytes,
+                    f'{url}: ответ больше {max_bytes} байт'
+                )
+
+    def test_anonymous_budgets(self):
+        """Бюджет запросов и размера ответа для анонимного пользователя."""
+        # Последние комментарии под карточками и суммы лайков
+        # страницы — по одному запросу
+        budgets = {
+            reverse('posts:home'): (4, 20000),
+            **{
+                reverse('posts:group_posts',
+                        kwargs={'slug': group.slug}): (5, 20000)
+                for group in self.groups
+            },
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): (6, 20000),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): (4, 20000),
+            # Комментарий и его поддерево вместе с авторами
+            reverse('posts:comment_replies',
+                    args=[self.comment.pk]): (2, 20000),
+            # Порция ленты: посты и суммы лайков, без пагинатора
+            reverse('posts:feed_chunk', args=['home']): (2, 20000),
+            reverse('posts:post_create'): (0, 1000),
+            reverse('posts:follow_index'): (0, 1000),
+            # Автор и страница списка
+            reverse('posts:profile_followers',
+                    kwargs={'username': self.author.username}): (2, 20000),
+            reverse('posts:profile_following',
+                    kwargs={'username': self.user.username}): (2, 20000),
+            reverse('posts:export_data'): (0, 1000),
+            reverse('posts:post_edit',
+                    kwargs={'post_id': self.post.id}): (0, 1000),
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}): (0, 1000),
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username}): (0, 1000),
+        }
+        self.check_budgets(self.client, budgets)
+
+    def test_api_budgets(self):
+        """Бюджет запросов API: число запросов не зависит от числа
+        постов в ответе."""
+        ids = ','.join(str(post.pk) for post in Post.objects.all()[:10])
+        budgets = {
+            reverse('posts:api_feed'): (1, 20000),
+            # Поиск группы или автора, горячая часть и начало архива
+            reverse('posts:api_group',
+                    kwargs={'slug': self.group.slug}): (3, 20000),
+            reverse('posts:api_profile',
+                    kwargs={'username': self.author.username}): (3, 20000),
+            # Пост и все его комментарии
+            reverse('posts:api_post',
+                    kwargs={'post_id': self.post.id}): (2, 20000),
+            f'{reverse("posts:api_posts_batch")}?ids={ids}': (1, 20000),
+        }
+        self.check_budgets(self.client, budgets)
+
+    def test_authorized_budgets(self):
+        """Бюджет запросов и размера ответа для авторизованного
+        пользователя."""
+        # Сессия и ее пользователь читаются из базы на каждый запрос:
+        # кеш сессий и пользователей по умолчанию выключен, см.
+        # core.auth. Лайки страницы: суммы и отметки зрителя
+        budgets = {
+            reverse('posts:home'): (9, 20000),
+            reverse('posts:group_posts',
+                    kwargs={'slug': self.group.slug}): (8, 20000),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): (10, 20000),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): (6, 25000),
+            reverse('posts:follow_index'): (7, 20000),
+            # Отметка просмотра пишется в транзакции, переключатель
+            # лент заново считает непрочитанное
+            reverse('posts:inbox'): (12, 20000),
+            reverse('posts:feed_chunk', args=['follow']): (4, 20000),
+            # Плюс отметки подписок зрителя на людей из списка
+            reverse('posts:profile_followers',
+                    kwargs={'username': self.author.username}): (4, 20000),
+            reverse('posts:profile_following',
+                    kwargs={'username': self.user.username}): (5, 20000),
+            reverse('posts:post_create'): (3, 10000),
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}): (7, 1000),
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username}): (4, 1000),
+        }
+        self.check_budgets(self.authorized_client, budgets)
+        # Лайк и его снятие: отметка и строка счетчика в транзакции.
+        # Бюджет на случай, когда строку случайного слота приходится
+        # создавать
+        self.check_budgets(self.authorized_client, {
+            reverse('posts:post_like',
+                    kwargs={'post_id': self.post.id}): (10, 1000),
+            reverse('posts:post_unlike',
+                    kwargs={'post_id': self.post.id}): (9, 1000),
+        }, method='post')
+
+    def test_author_budgets(self):
+        """Бюджет запросов для автора поста: редактирование
+        и комментарии."""
+        self.check_budgets(self.author_client, {
+            reverse('posts:post_edit',
+                    kwargs={'post_id': self.post.id}): (5, 10000),
+            # Выгрузка всей истории: сессия, пользователь и по запросу
+            # на горячие и архивные посты и комментарии и подписки.
+            # Строки читаются курсором порциями, число запросов
+            # не растет с числом записей
+            reverse('posts:export_data'): (7, 20000),
+            f'{reverse("posts:export_data")}?format=zip': (7, 20000),
+        })
+        # path комментария пишется после вставки, когда известен id,
+        # и увеличивается счетчик комментариев поста
+        self.check_budgets(self.author_client, {
+            reverse('posts:add_comment',
+                    kwargs={'post_id': self.post.id}): (8, 1000),
+        }, method='post', data={'text': 'Новый комментарий'})
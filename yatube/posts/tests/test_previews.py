@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..archive import archive_batch
+from ..models import ArchivedPost, Comment, Post, User
+from ..previews import attach_previews
+from ..threads import recount, save_comment
+from .utils import single_database
+
+
+@single_database
+class PreviewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        for post, count in zip(cls.posts, (0, 2, 5)):
+            for number in range(count):
+                save_comment(Comment(
+                    author=cls.author, post=post, text=f'Комментарий {number}'
+                ))
+
+    def setUp(self):
+        cache.clear()
+
+    def previews(self, posts):
+        return [
+            [comment.text for comment in post.latest_comments]
+            for post in posts
+        ]
+
+    def test_one_query(self):
+        """Последние комментарии всех постов читаются одним запросом
+        вместе с авторами, число комментариев хранится в посте."""
+        posts = list(Post.objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            attach_previews(posts)
+            self.assertEqual(
+                [comment.author.username for comment in
+                 posts[2].latest_comments],
+                ['author'] * 3
+            )
+        self.assertEqual(self.previews(posts), [
+            [],
+            ['Комментарий 0', 'Комментарий 1'],
+            ['Комментарий 2', 'Комментарий 3', 'Комментарий 4'],
+        ])
+        self.assertEqual([post.comment_count for post in posts], [0, 2, 5])
+
+    def test_feed(self):
+        """Карточка ленты выводит число комментариев и последние из них."""
+        response = self.client.get('/')
+        self.assertContains(response, 'Комментарии: 5')
+        self.assertContains(response, 'Комментарий 4')
+
+    def test_counter(self):
+        """Удаление уменьшает счетчик, recount исправляет счетчики
+        после bulk_create."""
+        Comment.objects.filter(post=self.posts[1]).first().delete()
+        Comment.objects.bulk_create(
+            Comment(author=self.author, post=self.posts[0], text='Массово')
+            for _ in range(4)
+        )
+        recount('default')
+        self.assertEqual(
+            [post.comment_count for post in Post.objects.order_by('pk')],
+            [4, 1, 5]
+        )
+
+    def test_post_delete_skips_counters(self):
+        """Удаление поста и перенос в архив не обновляют счетчики
+        комментариев, которые удаляются вместе с постом."""
+        with CaptureQueriesContext(connection) as captured:
+            self.posts[2].delete()
+            Post.objects.filter(pk=self.posts[1].pk).update(
+                pub_date=timezone.now() - timedelta(days=400)
+            )
+            archive_batch('default', timezone.now() - timedelta(days=365), 10)
+        updates = [
+            query['sql'] for query in captured
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1, updates)
+        self.assertEqual(ArchivedPost.objects.get().comment_count, 2)
+
+    def test_archived(self):
+        """Архивные посты получают превью из архивных комментариев."""
+        Post.objects.filter(pk=self.posts[2].pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        archive_batch('default', timezone.now() - timedelta(days=365), 10)
+        posts = [ArchivedPost.objects.get(), *Post.objects.order_by('pk')]
+        with self.assertNumQueries(2):
+            attach_previews(posts)
+        self.assertEqual(posts[0].comment_count, 5)
+        self.assertEqual(self.previews(posts)[0], [
+            'Комментарий 2', 'Комментарий 3', 'Комментарий 4'
+        ])
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, User
+from ..query_plans import feed_querysets, plan_problems
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        Comment.objects.create(
+            author=cls.user, post=cls.post, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_feed_plans_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком и не сортируют
+        результат во временном дереве."""
+        querysets = feed_querysets()
+        self.assertIn('posts:follow_index', querysets)
+        for name, queryset in querysets.items():
+            with self.subTest(name=name):
+                plan, problems = plan_problems(name, queryset)
+                self.assertEqual(problems, [], plan)
+
+    def test_full_scan_detected(self):
+        """Запрос без подходящего индекса считается проблемным."""
+        plan, problems = plan_problems(
+            'posts:home', Post.objects.order_by('text')
+        )
+        self.assertTrue(problems, plan)
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion, User
+from ..recommendations import FollowGraph, rebuild_suggestions
+
+
+class FollowGraphTest(SimpleTestCase):
+    def test_friends_of_friends(self):
+        """Рекомендуются подписки авторов пользователя, кроме уже
+        отслеживаемых, популярные выше."""
+        graph = FollowGraph(
+            followers=[1, 2, 2, 2, 5, 1],
+            authors=[2, 3, 4, 6, 3, 6],
+        )
+        node = list(graph.nodes).index(1)
+        authors, scores = graph.suggest(node, top=5)
+        ranked = [author for _, author in sorted(zip(-scores, authors))]
+        self.assertEqual(ranked, [3, 4])
+        authors, _ = graph.suggest(node, top=1)
+        self.assertEqual(list(authors), [3])
+
+
+class FollowSuggestionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'star', 'fan', 'newcomer')
+        }
+        for user, author in (('reader', 'friend'), ('friend', 'star'),
+                             ('fan', 'star')):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+        call_command('suggest_follows', stdout=StringIO())
+
+    def test_command_fills_table(self):
+        """Команда сохраняет рекомендации, новичкам — популярных."""
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(
+                user=self.users['reader']
+            ).values_list('author__username', flat=True)),
+            ['star']
+        )
+        self.assertEqual(
+            FollowSuggestion.objects.filter(
+                user=self.users['newcomer']
+            ).first().author, self.users['star']
+        )
+
+    def test_rebuild_in_batches(self):
+        """Пересчет идет короткими транзакциями по порциям
+        пользователей, рекомендации остальных удаляются."""
+        users = [self.users[name] for name in ('reader', 'friend', 'star',
+                                               'fan')]
+        with CaptureQueriesContext(connection) as context:
+            total = rebuild_suggestions(
+                FollowGraph.from_database(), 5,
+                [user.pk for user in users], batch_size=2
+            )
+        self.assertEqual(total, FollowSuggestion.objects.count())
+        self.assertEqual(
+            sum(query['sql'].startswith('SAVEPOINT')
+                for query in context.captured_queries), 2
+        )
+        self.assertFalse(FollowSuggestion.objects.filter(
+            user=self.users['newcomer']
+        ).exists())
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(
+                user=self.users['reader']
+            ).values_list('author__username', flat=True)),
+            ['star']
+        )
+
+    def test_follow_page_reads_suggestions(self):
+        """Страница подписок показывает рекомендации, пропуская авторов,
+        на которых пользователь уже подписался."""
+        self.client.force_login(self.users['reader'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [item.author for item in response.context['suggestions']],
+            [self.users['star']]
+        )
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['star']
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertFalse(response.context['suggestions'])
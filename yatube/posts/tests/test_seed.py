@@ -0,0 +1,41 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, User
+from .utils import single_database
+
+
+class SeedCommandTest(TestCase):
+    def seed(self, prefix):
+        call_command(
+            'seed', users=30, groups=3, posts=200, comments=300,
+            follows=5, seed=42, prefix=prefix, batch_size=50,
+            stdout=StringIO()
+        )
+
+    @single_database
+    def test_seed_creates_requested_volumes(self):
+        """Команда seed создает заданное число записей."""
+        self.seed('first')
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists()
+        )
+
+    def test_seed_is_reproducible(self):
+        """Одинаковый seed дает одинаковые данные."""
+        self.seed('first')
+        self.seed('second')
+        first = Post.objects.filter(
+            author__username__startswith='first_'
+        ).order_by('pk').values_list('text', flat=True)
+        second = Post.objects.filter(
+            author__username__startswith='second_'
+        ).order_by('pk').values_list('text', flat=True)
+        self.assertEqual(list(first), list(second))
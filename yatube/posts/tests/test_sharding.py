@@ -0,0 +1,144 @@
+import unittest
+from collections import namedtuple
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+from ..sharding import (AuthorShardRouter, IdList, ShardedFeed,
+                        shard_for_author, shard_for_post)
+
+FakePost = namedtuple('FakePost', 'pk pub_date')
+
+
+class ShardedFeedTest(SimpleTestCase):
+    def make_shards(self):
+        start = datetime(2022, 1, 1)
+        posts = [
+            FakePost(pk, start + timedelta(minutes=pk)) for pk in range(1, 26)
+        ]
+        shards = [[], [], []]
+        for post in posts:
+            shards[post.pk % 3].append(post)
+        return [
+            sorted(shard, key=lambda post: post.pub_date, reverse=True)
+            for shard in shards
+        ]
+
+    def test_merge_keeps_global_order(self):
+        """Слияние шардов дает общую ленту по убыванию даты."""
+        feed = ShardedFeed(self.make_shards())
+        self.assertEqual(feed.count(), 25)
+        self.assertEqual(
+            [post.pk for post in feed[0:5]], [25, 24, 23, 22, 21]
+        )
+        self.assertEqual([post.pk for post in feed[20:30]], [5, 4, 3, 2, 1])
+
+    def test_paginator_over_shards(self):
+        """ShardedFeed подходит для Paginator."""
+        page = Paginator(ShardedFeed(self.make_shards()), 10).get_page(3)
+        self.assertEqual([post.pk for post in page], [5, 4, 3, 2, 1])
+
+
+@override_settings(POST_SHARDS=['default', 'shard_1'])
+class ShardRoutingTest(SimpleTestCase):
+    def test_author_hash(self):
+        """Шард выбирается по id автора."""
+        self.assertEqual(shard_for_author(2), 'default')
+        self.assertEqual(shard_for_author(3), 'shard_1')
+
+    def test_post_id_prefix(self):
+        """Шард поста определяется по старшим битам id."""
+        self.assertEqual(shard_for_post(7), 'default')
+        self.assertEqual(
+            shard_for_post((1 << settings.POST_ID_SHARD_BITS) + 7), 'shard_1'
+        )
+
+    def test_router_writes_to_author_shard(self):
+        """Новый пост пишется в шард автора, комментарий в шард поста."""
+        router = AuthorShardRouter()
+        post = Post(author_id=3, text='Пост')
+        self.assertEqual(router.db_for_write(Post, instance=post), 'shard_1')
+        post._state.db = 'shard_1'
+        comment = Comment(post=post, author_id=2, text='Комментарий')
+        self.assertEqual(
+            router.db_for_write(Comment, instance=comment), 'shard_1'
+        )
+
+
+class IdListTest(TestCase):
+    def test_many_ids(self):
+        """Длинный список id уходит в запрос одним параметром."""
+        users = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(3)
+        ]
+        ids = [*range(users[-1].pk + 1, users[-1].pk + 5000), users[1].pk,
+               users[0].pk]
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(User.objects.filter(pk__in=IdList(ids)).order_by('pk')),
+                users[:2]
+            )
+
+
+@unittest.skipUnless(
+    len(settings.POST_SHARDS) > 1,
+    'Запуск: YATUBE_SHARD_DBS=a.sqlite3,b.sqlite3 '
+    'python manage.py test posts.tests.test_sharding'
+)
+class ShardedViewsTest(TransactionTestCase):
+    databases = set(settings.POST_SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        call_command('init_shards', stdout=StringIO())
+        self.authors = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(len(settings.POST_SHARDS))
+        ]
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(author=author, text=f'Пост {author}',
+                                group=self.group)
+            for author in self.authors
+        ]
+
+    def test_posts_spread_over_shards(self):
+        """Посты разных авторов лежат в разных базах и видны в лентах."""
+        self.assertEqual(
+            {post._state.db for post in self.posts},
+            set(settings.POST_SHARDS)
+        )
+        for url in (reverse('posts:home'),
+                    reverse('posts:group_posts', args=[self.group.slug])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), len(self.posts)
+                )
+
+    def test_detail_and_comment_on_shard(self):
+        """Страница поста и комментарии работают в шарде автора."""
+        post = self.posts[-1]
+        client = Client()
+        client.force_login(self.authors[0])
+        client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'}
+        )
+        response = client.get(reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(response.context['post'], post)
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertTrue(
+            Comment.objects.using(post._state.db).filter(post=post).exists()
+        )
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Group, Post, User
+from ..snapshot import plan, snapshot
+from .utils import single_database
+
+SNAPSHOT_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class SnapshotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SNAPSHOT_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(SNAPSHOT_ROOT, ignore_errors=True)
+
+    def read(self, path):
+        with open(os.path.join(SNAPSHOT_ROOT, path), encoding='utf-8') as f:
+            return f.read()
+
+    def test_pages(self):
+        """Копия содержит страницы групп, профилей и постов
+        с пагинацией, как их видит аноним."""
+        self.assertEqual(snapshot(SNAPSHOT_ROOT), (7, 0, 0))
+        self.assertIn('Пост 2', self.read('group/group/index.html'))
+        self.assertIn('Пост 0', self.read('profile/author/page-2.html'))
+        page = self.read(f'posts/{self.posts[0].pk}/index.html')
+        self.assertIn('Пост 0', page)
+        self.assertIn('Войти', page)
+
+    @single_database
+    def test_incremental(self):
+        """Повторный запуск перерисовывает только страницы, которые
+        выводят изменившиеся данные, и удаляет исчезнувшие."""
+        snapshot(SNAPSHOT_ROOT)
+        self.assertEqual(snapshot(SNAPSHOT_ROOT), (0, 7, 0))
+        Comment.objects.create(
+            author=self.author, post=self.posts[0], text='Комментарий'
+        )
+        # Пост и вторые страницы группы и профиля с его карточкой
+        self.assertEqual(snapshot(SNAPSHOT_ROOT), (3, 4, 0))
+        self.assertIn(
+            'Комментарий', self.read(f'posts/{self.posts[0].pk}/index.html')
+        )
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+        # Пропали пост и вторые страницы группы и профиля. Первые
+        # страницы и остальные посты выводят число постов автора
+        self.assertEqual(snapshot(SNAPSHOT_ROOT), (4, 0, 3))
+        self.assertFalse(os.path.exists(
+            os.path.join(SNAPSHOT_ROOT, 'group/group/page-2.html')
+        ))
+
+    def test_edit(self):
+        """Правка поста перерисовывает его страницу и страницы лент
+        с его карточкой, хотя текст в отпечаток не входит."""
+        snapshot(SNAPSHOT_ROOT)
+        post = self.posts[1]
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(snapshot(SNAPSHOT_ROOT), (3, 4, 0))
+        self.assertIn('Правка', self.read('group/group/index.html'))
+
+    def test_plan_reads_signatures(self):
+        """План не читает тексты постов и строки комментариев."""
+        with CaptureQueriesContext(connection) as captured:
+            list(plan())
+        for query in captured:
+            self.assertNotIn('"text"', query['sql'])
+            self.assertNotIn('"path"', query['sql'])
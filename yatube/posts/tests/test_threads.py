@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_batch
+from ..models import Comment, Post, User
+from ..threads import save_comment, thread
+from .utils import single_database
+
+
+@single_database
+class ThreadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def reply(self, text, parent=None):
+        return save_comment(
+            Comment(author=self.author, post=self.post, text=text), parent
+        )
+
+    def chain(self, length):
+        """Ветка из length комментариев, каждый отвечает предыдущему."""
+        comments = [self.reply('Ответ 0')]
+        for number in range(1, length):
+            comments.append(self.reply(f'Ответ {number}', comments[-1]))
+        return comments
+
+    def test_thread_order(self):
+        """Ветка читается одним запросом в порядке обхода в глубину,
+        глубина и число ответов хранятся в комментарии."""
+        first = self.reply('Первый')
+        second = self.reply('Второй')
+        reply = self.reply('Ответ', first)
+        nested = self.reply('Ответ на ответ', reply)
+        with self.assertNumQueries(1):
+            comments = list(thread(self.post, 10))
+        self.assertEqual(comments, [first, reply, nested, second])
+        self.assertEqual([c.depth for c in comments], [0, 1, 2, 0])
+        self.assertEqual(
+            [c.child_count for c in comments], [1, 1, 0, 0]
+        )
+        nested.delete()
+        reply.refresh_from_db()
+        self.assertEqual(reply.child_count, 0)
+
+    def test_plain_create(self):
+        """Комментарий, созданный мимо save_comment, например в админке,
+        тоже получает path, глубину и место в счетчиках."""
+        first = self.reply('Первый')
+        reply = Comment.objects.create(
+            author=self.author, post=self.post, text='Ответ', parent=first
+        )
+        last = Comment.objects.create(
+            author=self.author, post=self.post, text='Последний'
+        )
+        self.assertEqual(
+            list(thread(self.post, 10)), [first, reply, last]
+        )
+        self.assertEqual(reply.depth, 1)
+        first.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual((first.child_count, self.post.comment_count), (1, 3))
+
+    @override_settings(COMMENT_MAX_DEPTH=1)
+    def test_max_depth(self):
+        """Слишком глубокий ответ встает рядом с родителем."""
+        top, reply = self.chain(2)
+        deep = self.reply('Глубоко', reply)
+        self.assertEqual((deep.parent_id, deep.depth), (top.pk, 1))
+
+    def test_add_reply(self):
+        """Комментарий с parent встает ответом, негодный parent
+        не мешает сохранить комментарий верхнего уровня."""
+        top = self.reply('Первый')
+        client = Client()
+        client.force_login(self.author)
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        client.post(url, {'text': 'Ответ', 'parent': top.pk})
+        client.post(url, {'text': 'Без родителя', 'parent': 'x'})
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual((reply.parent, reply.depth), (top, 1))
+        self.assertIsNone(Comment.objects.get(text='Без родителя').parent)
+
+    @override_settings(COMMENT_PAGE_LEVELS=2)
+    def test_collapsed_replies(self):
+        """Страница поста показывает два уровня, остальное
+        подгружается фрагментом."""
+        comments = self.chain(4)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(list(response.context['comments']), comments[:2])
+        more = reverse('posts:comment_replies', args=[comments[1].pk])
+        self.assertContains(response, more)
+        with self.assertNumQueries(2):
+            response = self.client.get(more)
+        self.assertEqual(list(response.context['comments']), comments[2:])
+        self.assertNotContains(response, '<html')
+
+    def test_archived_thread(self):
+        """Архив сохраняет ветку."""
+        comments = self.chain(3)
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        archive_batch('default', timezone.now() - timedelta(days=365), 10)
+        response = self.client.get(
+            reverse('posts:comment_replies', args=[comments[0].pk])
+        )
+        self.assertEqual(
+            [comment.pk for comment in response.context['comments']],
+            [comment.pk for comment in comments[1:]]
+        )
+        self.assertTrue(response.context['is_archived'])
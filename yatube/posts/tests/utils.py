@@ -0,0 +1,11 @@
+import unittest
+
+from django.conf import settings
+
+# Тест читает или меняет посты через Post.objects без выбора базы
+# и видит только основную базу. С YATUBE_SHARD_DBS посты разъезжаются
+# по шардам, эти случаи проверяет test_sharding.
+single_database = unittest.skipIf(
+    len(settings.POST_SHARDS) > 1,
+    'Тест работает с постами только основной базы'
+)
@@ -0,0 +1,157 @@
+"""Ветки комментариев. path — id предков и самого комментария
+по PATH_STEP шестнадцатеричных знаков. Сортировка по path дает обход
+ветки в глубину, а поддерево — это диапазон [path, path + PATH_END),
+поэтому ветка читается одним запросом по индексу (post, path)."""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedPost, Comment, Post
+
+PATH_STEP = 16
+# Больше любой шестнадцатеричной цифры: верхняя граница поддерева
+PATH_END = 'g'
+
+
+class DeletedPosts(threading.local):
+    """id постов, которые сейчас удаляются вместе с комментариями."""
+
+    def __init__(self):
+        self.ids = set()
+
+
+deleted_posts = DeletedPosts()
+
+
+def segment(pk):
+    return format(pk, f'0{PATH_STEP}x')
+
+
+def parent_id(path):
+    """id родителя по path, подходит и для архивных комментариев."""
+    if len(path) < 2 * PATH_STEP:
+        return None
+    return int(path[-2 * PATH_STEP:-PATH_STEP], 16)
+
+
+def thread(post, last_depth):
+    """Комментарии поста в порядке ветки до глубины last_depth."""
+    return post.comments.filter(depth__lte=last_depth).select_related(
+        'author'
+    ).order_by('path')
+
+
+def subtree(comment, last_depth):
+    """Ответы на comment до глубины last_depth одним диапазоном."""
+    return type(comment).objects.using(comment._state.db).filter(
+        post_id=comment.post_id,
+        path__gt=comment.path,
+        path__lt=comment.path + PATH_END,
+        depth__lte=last_depth,
+    ).select_related('author').order_by('path')
+
+
+def save_comment(comment, parent=None):
+    """Сохраняет comment ответом на parent. path, depth и счетчики
+    проставляет remember_comment в той же транзакции."""
+    comment.parent = parent
+    alias = router.db_for_write(Comment, instance=comment)
+    with transaction.atomic(using=alias):
+        comment.save(using=alias)
+    return comment
+
+
+def remember_comment(instance, created, raw, using, **kwargs):
+    """post_save нового комментария, пара forget_comment: проставляет
+    path и depth и увеличивает счетчики поста и родителя, как бы
+    комментарий ни создавался — в представлении, в админке или через
+    objects.create. Ответ глубже COMMENT_MAX_DEPTH встает рядом
+    с родителем: path ограничен 255 знаками."""
+    if not created or raw:
+        return
+    path, depth = '', 0
+    parent = instance.parent if instance.parent_id else None
+    if parent is not None:
+        path, depth = parent.path, parent.depth + 1
+        if depth > settings.COMMENT_MAX_DEPTH:
+            path, depth = path[:-PATH_STEP], parent.depth
+            instance.parent_id = int(path[-PATH_STEP:], 16) if path else None
+            Comment.parent.field.delete_cached_value(instance)
+    instance.depth = depth
+    instance.path = path + segment(instance.pk)
+    # Внутри транзакции save_comment точка сохранения не нужна
+    with transaction.atomic(using=using, savepoint=False):
+        comments = Comment.objects.using(using)
+        comments.filter(pk=instance.pk).update(
+            path=instance.path, depth=depth, parent_id=instance.parent_id
+        )
+        Post.objects.using(using).filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+        if instance.parent_id:
+            comments.filter(pk=instance.parent_id).update(
+                child_count=F('child_count') + 1
+            )
+
+
+@contextmanager
+def deleting_posts(ids):
+    """Комментарии постов ids удаляются вместе с постами: их счетчики
+    не обновляются построчно перед удалением."""
+    deleted_posts.ids.update(ids)
+    try:
+        yield
+    finally:
+        deleted_posts.ids.difference_update(ids)
+
+
+def mark_deleted_post(instance, **kwargs):
+    """pre_delete поста: Django удаляет комментарии раньше поста."""
+    deleted_posts.ids.add(instance.pk)
+
+
+def unmark_deleted_post(instance, **kwargs):
+    deleted_posts.ids.discard(instance.pk)
+
+
+def forget_comment(instance, using, **kwargs):
+    """Удаленный комментарий больше не считается у поста и родителя.
+    Комментарии удаляемого поста пропускаются."""
+    if instance.post_id in deleted_posts.ids:
+        return
+    # Комментарии из bulk_create счетчик не увеличивали
+    Post.objects.using(using).filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+    if instance.parent_id:
+        Comment.objects.using(using).filter(
+            pk=instance.parent_id, child_count__gt=0
+        ).update(child_count=F('child_count') - 1)
+
+
+def fill_paths(queryset, batch_size=1000):
+    """Проставляет path комментариям верхнего уровня, созданным
+    через bulk_create: id до вставки неизвестен."""
+    batch = []
+    for pk in queryset.filter(path='').values_list('pk', flat=True).iterator():
+        batch.append(Comment(pk=pk, path=segment(pk)))
+        if len(batch) == batch_size:
+            queryset.bulk_update(batch, ['path'])
+            batch = []
+    queryset.bulk_update(batch, ['path'])
+
+
+def recount(alias):
+    """Пересчитывает comment_count всех постов базы, в том числе
+    архивных, одним UPDATE на таблицу."""
+    for post_model in (Post, ArchivedPost):
+        comments = post_model.comments.rel.related_model.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(count=Count('pk'))
+        post_model.objects.using(alias).update(comment_count=Coalesce(
+            Subquery(comments.values('count')), 0
+        ))
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -9,17 +9,39 @@ handler404 = 'core.views.page_not_found'
 
 urlpatterns = [
     path('', views.index, name='home'),
+    path('api/posts/', api.feed, name='api_feed'),
+    path('api/posts/batch/', api.posts_batch, name='api_posts_batch'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('api/group/<slug:slug>/', api.group_feed, name='api_group'),
+    path('api/profile/<str:username>/',
+         api.profile_feed, name='api_profile'
+         ),
+    path('comments/<int:comment_id>/replies/', views.comment_replies,
+         name='comment_replies'),
     path('create/', views.post_create, name='post_create'),
+    path('export/', views.export_data, name='export_data'),
+    path('feed/<str:scope>/', views.feed_chunk, name='feed_chunk'),
     path('follow/', views.follow_index, name='follow_index'),
     path('group/<slug:slug>/', views.goup_posts, name='group_posts'),
+    path('inbox/', views.inbox, name='inbox'),
     path('profile/<str:username>/follow/',
          views.profile_follow, name='profile_follow'
          ),
+    path('profile/<str:username>/followers/',
+         views.profile_followers, name='profile_followers'
+         ),
+    path('profile/<str:username>/following/',
+         views.profile_following, name='profile_following'
+         ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'
          ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path('posts/<int:post_id>/unlike/',
+         views.post_unlike, name='post_unlike'
+         ),
     path('profile/<str:username>/', views.profile, name='profile'),
     path(
         'profile/<str:username>/unfollow/',
@@ -1,5 +1,14 @@
+from datetime import datetime, timedelta
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+
+from .sharding import sharded, sort_key
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
 
 
 def get_pages(queryset, request):
@@ -13,3 +22,67 @@ def get_pages(queryset, request):
         'page_number': page_number,
         'page_obj': page_obj,
     }
+
+
+def format_cursor(pub_date, pk):
+    return f'{(pub_date - EPOCH) // MICROSECOND}.{pk}'
+
+
+def make_cursor(post):
+    return format_cursor(*sort_key(post))
+
+
+def parse_cursor(cursor):
+    try:
+        microseconds, pk = map(int, cursor.split('.'))
+        return EPOCH + timedelta(microseconds=microseconds), pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def normalize_cursor(cursor):
+    """Курсор в каноническом виде, для испорченного — None: разные
+    записи одной позиции дают один ключ кеша."""
+    position = parse_cursor(cursor)
+    return None if position is None else format_cursor(*position)
+
+
+def keyset_page(queryset, cursor, per_page=None, archive=None):
+    """Страница ленты после курсора в порядке (-pub_date, -id).
+    В отличие от Paginator не считает записи и не пропускает OFFSET
+    строк: условие по курсору сразу попадает в индекс. Если задан
+    archive, недостающие записи дочитываются из архива, который
+    целиком старше queryset.
+    Возвращает посты и курсор следующей страницы или None."""
+    per_page = per_page or settings.POSTS_PER_PAGE
+    position = parse_cursor(cursor)
+    posts = []
+    for source in (queryset, archive):
+        if source is None or len(posts) > per_page:
+            continue
+        source = source.order_by('-pub_date', '-pk')
+        if position is not None:
+            pub_date, pk = position
+            source = source.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        posts.extend(sharded(source)[:per_page + 1 - len(posts)])
+    next_cursor = None
+    if len(posts) > per_page:
+        posts = posts[:per_page]
+        next_cursor = make_cursor(posts[-1])
+    return posts, next_cursor
+
+
+def id_page(queryset, cursor, per_page=None):
+    """Страница по убыванию id после курсора, для списков без дат."""
+    per_page = per_page or settings.POSTS_PER_PAGE
+    queryset = queryset.order_by('-pk')
+    if cursor and cursor.isdigit():
+        queryset = queryset.filter(pk__lt=int(cursor))
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = rows[-1].pk
+    return rows, next_cursor
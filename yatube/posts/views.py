@@ -1,48 +1,209 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.http import is_safe_url, urlencode
+from django.views.decorators.http import require_POST
 
+from core.jobs import enqueue
+from core.pagecache import depends_on, fill, fill_response, hole_punched
+from core.ratelimit import ratelimit
+from core.routers import pin_primary
+
+from .archive import with_archive
+from .export import iter_jsonl, iter_zip
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_pages
+from .inbox import format_moment, last_seen, mark_seen, parse_moment
+from .likes import like, post_exists, unlike
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                     FollowSuggestion, Group, Post, User)
+from .previews import attach_previews
+from .tasks import warm_thumbnails
+from .threads import save_comment, subtree, thread
+from .utils import get_pages, id_page, keyset_page, normalize_cursor
 
 
 @login_required
+@pin_primary
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.for_post_id(post_id))
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        parent = request.POST.get('parent', '')
+        parent = (
+            post.comments.filter(pk=parent).first()
+            if parent.isdigit() else None
+        )
+        save_comment(comment, parent)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def comment_replies(request, comment_id):
+    """Свернутые ответы на комментарий: фрагмент ветки, который
+    скрипт страницы поста вставляет по ссылке."""
+    comment = Comment.objects.for_id(comment_id).first()
+    is_archived = comment is None
+    if is_archived:
+        comment = get_object_or_404(
+            ArchivedComment.objects.for_id(comment_id)
+        )
+    last_depth = comment.depth + settings.COMMENT_PAGE_LEVELS
+    context = {
+        'comments': subtree(comment, last_depth),
+        'last_depth': last_depth,
+        'is_archived': is_archived,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+@login_required
+@ratelimit('10/h', methods=('GET',))
+def export_data(request):
+    user = request.user
+    if request.GET.get('format') == 'zip':
+        include_images = request.GET.get('images') == '1'
+        response = StreamingHttpResponse(
+            iter_zip(user, include_images),
+            content_type='application/zip'
+        )
+        filename = f'{user.username}.zip'
+    else:
+        response = StreamingHttpResponse(
+            iter_jsonl(user),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        filename = f'{user.username}.jsonl'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def feed_chunk(request, scope):
+    """Следующая порция карточек ленты для бесконечной прокрутки:
+    только HTML постов и метка со ссылкой на следующую порцию.
+    Порции общей ленты кешируются для всех, ленты подписок —
+    для каждого пользователя."""
+    cursor = normalize_cursor(request.GET.get('cursor'))
+    if scope == 'home':
+        hot, cold = Post.objects.all(), ArchivedPost.objects.all()
+        key = f'feed-chunk:home:{cursor}'
+    elif scope == 'follow' and request.user.is_authenticated:
+        hot = Post.objects.followed_by(request.user)
+        cold = ArchivedPost.objects.followed_by(request.user)
+        key = f'feed-chunk:follow:{request.user.pk}:{cursor}'
+    else:
+        raise Http404
+    html = cache.get(key)
+    if html is None:
+        posts, next_cursor = keyset_page(
+            hot.for_feed(), cursor, archive=cold.for_feed()
+        )
+        attach_previews(posts)
+        html = render_to_string('includes/feed_chunk.html', {
+            'posts': posts,
+            'page_ids': [post.id for post in posts],
+            'has_next': next_cursor is not None,
+            'scope': scope,
+            'cursor': cursor,
+            'punch_holes': True,
+        }, request)
+        cache.set(key, html, settings.FEED_CHUNK_TIMEOUT)
+    return HttpResponse(fill(request, html))
+
+
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post = Post.objects.filter(author__following__user=request.user)
+    post = with_archive(
+        Post.objects.followed_by(request.user).for_feed(),
+        ArchivedPost.objects.followed_by(request.user).for_feed(),
+        f'follow:{request.user.pk}'
+    )
     context = get_pages(post, request)
-    return render(request, template, context)
+    attach_previews(context['page_obj'])
+    context['page_ids'] = [post.id for post in context['page_obj']]
+    # Рекомендации посчитаны заранее, на странице только одно чтение
+    context['suggestions'] = FollowSuggestion.objects.filter(
+        user=request.user
+    ).exclude(
+        author__following__user=request.user
+    ).select_related('author')[:settings.FOLLOW_SUGGESTIONS]
+    return fill_response(request, render(request, template, context))
 
 
+@hole_punched
 def goup_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
+    depends_on(request, f'group:{group.pk}')
     context = {
         'group': group,
     }
-    context.update(get_pages(group.posts.all(), request))
+    context.update(get_pages(with_archive(
+        group.posts.for_feed(), group.archived_posts.for_feed(),
+        f'group:{group.pk}'
+    ), request))
+    attach_previews(context['page_obj'])
+    context['page_ids'] = [post.id for post in context['page_obj']]
+    depends_on(request, *(f'post:{pk}' for pk in context['page_ids']))
+    return render(request, template, context)
+
+
+@login_required
+def inbox(request):
+    """Новые посты избранных авторов. Отметка прочитанного и момент
+    первой страницы переходят по страницам вместе с курсором, поэтому
+    плашки «новое» не пропадают на следующих страницах. Отметка
+    сдвигается, только когда страница дошла до старой отметки: все
+    новые посты показаны."""
+    template = 'posts/inbox.html'
+    cursor = request.GET.get('cursor')
+    seen = parse_moment(request.GET.get('seen'))
+    until = parse_moment(request.GET.get('until'))
+    if cursor is None or seen is None or until is None:
+        seen = last_seen(request.user)
+        # Момент до чтения ленты: посты, созданные во время запроса,
+        # не будут отмечены просмотренными, не попав на страницу
+        until = timezone.now()
+    posts, next_cursor = keyset_page(
+        Post.objects.followed_by(request.user).for_feed(), cursor
+    )
+    attach_previews(posts)
+    if next_cursor is None or posts[-1].pub_date <= seen:
+        mark_seen(request.user, until)
+    context = {
+        'posts': posts,
+        'page_ids': [post.id for post in posts],
+        'next_cursor': next_cursor,
+        'seen': seen,
+        'moments': urlencode({
+            'seen': format_moment(seen), 'until': format_moment(until)
+        }),
+        'inbox': True,
+    }
     return render(request, template, context)
 
 
+@hole_punched
 def index(request):
     template = 'posts/index.html'
-    context = get_pages(Post.objects.all(), request)
+    depends_on(request, 'feed')
+    context = get_pages(with_archive(
+        Post.objects.for_feed(), ArchivedPost.objects.for_feed(), 'home'
+    ), request)
+    attach_previews(context['page_obj'])
+    context['page_ids'] = [post.id for post in context['page_obj']]
+    depends_on(request, *(f'post:{pk}' for pk in context['page_ids']))
     return render(request, template, context)
 
 
 @login_required
+@pin_primary
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -53,29 +214,50 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            enqueue(warm_thumbnails, post_id=post.pk)
         return redirect('posts:profile', username=request.user)
     return render(request, template, {"form": form})
 
 
+@hole_punched
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    depends_on(request, f'post:{post_id}')
+    post = Post.objects.for_feed().for_post_id(post_id).first()
+    is_archived = post is None
+    if is_archived:
+        # Старые посты ищем в архиве, ссылки на них не меняются
+        post = get_object_or_404(
+            ArchivedPost.objects.for_feed().for_post_id(post_id)
+        )
+    # Глубже показанных уровней ветки подгружаются по ссылке
+    last_depth = settings.COMMENT_PAGE_LEVELS - 1
+    comments = thread(post, last_depth)
     form = CommentForm(request.POST or None)
-    post_count = post.author.posts.count()
+    depends_on(request, f'author:{post.author_id}')
+    post_count = with_archive(
+        Post.objects.for_author(post.author),
+        ArchivedPost.objects.for_author(post.author),
+        f'author:{post.author_id}'
+    ).count()
     context = {
         'post': post,
+        'is_archived': is_archived,
         'form': form,
         'post_count': post_count,
-        'comments': comments
+        'comments': comments,
+        'last_depth': last_depth,
+        'page_ids': [post.id],
     }
     return render(request, template, context)
 
 
 @login_required
+@pin_primary
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.for_post_id(post_id))
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
@@ -84,7 +266,9 @@ def post_edit(request, post_id):
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            enqueue(warm_thumbnails, post_id=post.pk)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -94,22 +278,83 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+def back_or_post(request, post_id):
+    """Возвращает на страницу, с которой поставили лайк."""
+    referer = request.META.get('HTTP_REFERER')
+    if referer and is_safe_url(
+        referer, {request.get_host()}, request.is_secure()
+    ):
+        return redirect(referer)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+@pin_primary
+def post_like(request, post_id):
+    if not post_exists(post_id):
+        raise Http404
+    like(request.user, post_id)
+    return back_or_post(request, post_id)
+
+
+@login_required
+@require_POST
+@pin_primary
+def post_unlike(request, post_id):
+    unlike(request.user, post_id)
+    return back_or_post(request, post_id)
+
+
+@hole_punched
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    post_count = author.posts.count()
-    is_following = author.following.filter(
-        user_id=request.user.id).exists()
+    depends_on(request, f'author:{author.pk}')
     context = {
         'author': author,
-        'post_count': post_count,
-        'is_following': is_following,
     }
-    context.update(get_pages(author.posts.all(), request))
+    context.update(get_pages(with_archive(
+        Post.objects.for_author(author).for_feed(),
+        ArchivedPost.objects.for_author(author).for_feed(),
+        f'author:{author.pk}'
+    ), request))
+    # Число постов уже посчитано пагинатором
+    context['post_count'] = context['paginator'].count
+    attach_previews(context['page_obj'])
+    context['page_ids'] = [post.id for post in context['page_obj']]
+    depends_on(request, *(f'post:{pk}' for pk in context['page_ids']))
+    return render(request, template, context)
+
+
+def follow_list(request, username, followers):
+    """Подписчики автора или его подписки. Пользователи приходят
+    в одном запросе с подписками, а отметки «вы подписаны» для всей
+    страницы одним запросом."""
+    template = 'posts/follow_list.html'
+    author = get_object_or_404(User, username=username)
+    if followers:
+        rows = Follow.objects.filter(author=author).select_related('user')
+    else:
+        rows = Follow.objects.filter(user=author).select_related('author')
+    rows, next_cursor = id_page(rows, request.GET.get('cursor'))
+    users = [row.user if followers else row.author for row in rows]
+    followed = set()
+    if request.user.is_authenticated and users:
+        followed = set(Follow.objects.filter(
+            user=request.user, author__in=users
+        ).values_list('author_id', flat=True))
+    context = {
+        'author': author,
+        'followers': followers,
+        'users': [(user, user.pk in followed) for user in users],
+        'next_cursor': next_cursor,
+    }
     return render(request, template, context)
 
 
 @login_required
+@pin_primary
 def profile_follow(request, username):
     if username != request.user.username:
         author = get_object_or_404(User, username=username)
@@ -120,7 +365,16 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+def profile_followers(request, username):
+    return follow_list(request, username, followers=True)
+
+
+def profile_following(request, username):
+    return follow_list(request, username, followers=False)
+
+
 @login_required
+@pin_primary
 def profile_unfollow(request, username):
     get_object_or_404(
         Follow,
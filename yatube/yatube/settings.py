@@ -14,6 +14,8 @@ import os
 
 POSTS_PER_PAGE = 10
 
+EXPORT_CHUNK_SIZE = 500
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -52,15 +54,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.LazySessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.LazyAuthenticationMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
+    'core.middleware.LazyMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сессии в базе. cached_db читает сессию из кеша, а базу только при
+# промахе, но включается только с общим для всех процессов CACHES:
+# иначе выход в одном воркере не сбрасывает сессию в остальных
+SESSION_ENGINE = os.getenv(
+    'YATUBE_SESSION_ENGINE', 'django.contrib.sessions.backends.db'
+)
+
+AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+# Сколько секунд пользователь сессии хранится в кеше. 0 выключает кеш,
+# включать только с общим для всех процессов CACHES, см. core.auth
+USER_CACHE_TIMEOUT = int(os.getenv('YATUBE_USER_CACHE_TIMEOUT', 0))
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -76,6 +93,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.inbox.inbox',
             ],
         },
     },
@@ -91,9 +109,112 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Применяются к каждому новому соединению, см. core.db.configure_sqlite.
+# WAL позволяет читать во время записи, busy_timeout ждет снятия
+# блокировки вместо ошибки "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# Реплика для чтения лент, например копия основной базы, которую
+# обновляет команда sync_replica. Без переменной окружения все идет
+# в основную базу.
+DATABASE_REPLICA = None
+if os.getenv('YATUBE_REPLICA_DB'):
+    DATABASE_REPLICA = 'replica'
+    DATABASES[DATABASE_REPLICA] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('YATUBE_REPLICA_DB'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Дополнительные базы для постов и комментариев, список путей к файлам
+# SQLite через запятую. Основная база остается нулевым шардом и хранит
+# все остальные таблицы. Новые базы готовит команда init_shards.
+# Подписки, лайки и их счетчики, отметки входящих и рекомендации
+# остаются в основной базе и ссылаются на посты только по id.
+POST_SHARDS = ['default']
+for number, path in enumerate(
+    filter(None, os.getenv('YATUBE_SHARD_DBS', '').split(',')), 1
+):
+    POST_SHARDS.append(f'shard_{number}')
+    DATABASES[f'shard_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+    }
+# Старшие биты id поста и комментария хранят номер шарда
+POST_ID_SHARD_BITS = 40
+
+# Посты старше этого срока команда archive_posts переносит в архив
+ARCHIVE_AFTER_DAYS = 365
+# Сколько секунд хранится число архивных постов ленты
+ARCHIVE_COUNT_TIMEOUT = 60 * 60
+
+# С шардами тесты открывают все базы, см. core.testrunner
+TEST_RUNNER = 'core.testrunner.ShardAwareRunner'
+
+DATABASE_ROUTERS = [
+    'posts.sharding.AuthorShardRouter',
+    'core.routers.PrimaryReplicaRouter',
+]
+REPLICA_ROUTED_APPS = ('posts',)
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS = 10
+# Подписанная cookie с id пользователя, см. core.routers.pin_primary
+REPLICA_PIN_COOKIE = 'db_pin'
+
+# Сколько секунд кешируются порции ленты для бесконечной прокрутки,
+# столько же, сколько фрагмент первой страницы в шаблоне
+FEED_CHUNK_TIMEOUT = 20
+
+# Сколько секунд хранятся скелеты страниц с дырками, см. core.pagecache.
+# 0 выключает кеш. Включается только с общим для всех процессов кешем
+PAGE_CACHE_TIMEOUT = int(os.getenv('YATUBE_PAGE_CACHE_TIMEOUT', 0))
+# Сколько секунд кешируются id авторов, на которых подписан пользователь,
+# см. posts.following. 0 выключает кеш. Включается только с общим для
+# всех процессов кешем
+FOLLOWING_CACHE_TIMEOUT = int(os.getenv('YATUBE_FOLLOWING_CACHE_TIMEOUT', 0))
+
+# Сколько последних комментариев показывать под карточкой ленты
+COMMENT_PREVIEW_SIZE = 3
+# Ответы глубже этого уровня встают рядом с родителем
+COMMENT_MAX_DEPTH = 10
+# Сколько уровней ветки комментариев выводится сразу, глубже —
+# по ссылке фрагментом
+COMMENT_PAGE_LEVELS = 3
+
+# На сколько строк раскладывается счетчик лайков поста, см. posts.likes
+LIKE_COUNTER_SLOTS = 8
+# Сколько секунд кешируется сумма лайков поста
+LIKE_COUNT_CACHE_TIMEOUT = 60
+
+# Наибольшее число постов в одном запросе к api/posts/batch/
+API_BATCH_LIMIT = 100
+
+# Сколько рекомендаций авторов хранить и показывать пользователю
+FOLLOW_SUGGESTIONS = 5
+
+# Сколько секунд кешируется число непрочитанных постов
+INBOX_UNREAD_TIMEOUT = 60
+
+# Очередь фоновых задач, см. core.jobs и команду worker
+JOB_MAX_ATTEMPTS = 5
+JOB_LEASE_SECONDS = 5 * 60
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 60 * 60
+JOB_WORKER_THREADS = 4
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,14 +254,29 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# Страницы about и ошибок, собранные командой prerender
+PRERENDER_ROOT = os.path.join(BASE_DIR, 'prerendered')
+# Статическая копия групп, профилей и постов, см. команду snapshot
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, 'snapshot')
 
 # какие страницы надо показывать пользователю после входа в аккаунт и при выходе из него
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:home'
 # LOGOUT_REDIRECT_URL = 'posts:home'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма сохраняются в очередь и уходят пачками фоновой задачей
+# через OUTBOX_DELIVERY_BACKEND, см. core.mail
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+OUTBOX_BATCH_SIZE = 100
+# Повторное письмо с тем же заголовком X-Outbox-Dedupe тем же адресатам
+# в течение этого времени не отправляется еще раз
+OUTBOX_DEDUPE_SECONDS = 5 * 60
+# Сколько секунд копить письма перед отправкой
+OUTBOX_FLUSH_DELAY = 5
+# Через сколько секунд пачка упавшей отправки возвращается в очередь
+OUTBOX_CLAIM_SECONDS = 10 * 60
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -152,3 +288,51 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Лимиты запросов по имени URL, см. core.ratelimit. key: 'user'
+# считает запросы пользователя (анонимов по адресу), 'ip' — адреса.
+# Счетчики окон лежат в кеше default: с LocMemCache каждый воркер
+# считает свой лимит, в продакшене нужен общий кеш
+RATELIMIT_ENABLED = True
+RATELIMITS = {
+    'posts:add_comment': {'rate': '20/m', 'key': 'user'},
+    'posts:post_create': {'rate': '10/m', 'key': 'user'},
+    'posts:profile_follow': {
+        'rate': '60/m', 'key': 'user', 'methods': ('GET',)
+    },
+    'posts:post_like': {'rate': '60/m', 'key': 'user'},
+    'posts:post_unlike': {'rate': '60/m', 'key': 'user'},
+    'users:signup': {'rate': '10/h', 'key': 'ip'},
+    'users:login': {'rate': '10/m', 'key': 'ip'},
+}
+
+# Замеры SQL и шаблонов на запрос, см. core.middleware.QueryTimingMiddleware
+# По умолчанию выключены: замер оборачивает каждый SQL-запрос и шаблон
+QUERY_TIMING_SAMPLE_RATE = float(
+    os.getenv('YATUBE_QUERY_TIMING_SAMPLE_RATE', 0)
+)
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'yatube.jobs': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'yatube.loadtest': {
+            'handlers': ['console'],
+            'level': 'ERROR',
+        },
+    },
+}